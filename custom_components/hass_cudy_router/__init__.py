@@ -5,35 +5,79 @@ import importlib.util
 import logging
 from typing import Any, List
 
+import voluptuous as vol
+
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.helpers import config_validation as cv
 
 from . import registry
-from .client import CudyClient
-from .const import DOMAIN, PLATFORMS as DEFAULT_PLATFORMS
+from .client import DEFAULT_CONNECTION_LIMIT, CudyClient
+from .const import (
+    ATTR_ENTRY_ID,
+    CONF_MAX_BODY_SIZE,
+    CONF_MAX_CONCURRENCY,
+    DEFAULT_MAX_BODY_SIZE,
+    DEFAULT_MAX_CONCURRENCY,
+    DATA_PENDING_SESSIONS,
+    DOMAIN,
+    EVENT_APPLY,
+    MIN_MAX_BODY_SIZE,
+    PLATFORMS as DEFAULT_PLATFORMS,
+    SERVICE_REDISCOVER_CAPABILITIES,
+)
 from .model_detect import detect_model
+from .storage import CudyStore
 
 _LOGGER = logging.getLogger(__name__)
 
+REDISCOVER_SCHEMA = vol.Schema({vol.Optional(ATTR_ENTRY_ID): cv.string})
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     protocol = entry.data.get("protocol", "http")
     use_https = protocol.lower() in ("https", "ssl", "tls")
+    options = getattr(entry, "options", None) or {}
+
+    store = CudyStore(hass, entry.entry_id)
+    await store.async_load()
 
     client = CudyClient(
         host=entry.data.get("host"),
         username=entry.data.get("username"),
         password=entry.data.get("password"),
         use_https=use_https,
+        # room for a full poll plus a switch/button action at the same time
+        connection_limit=max(
+            DEFAULT_CONNECTION_LIMIT,
+            int(options.get(CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY)) + 1,
+        ),
+        on_session_change=store.async_schedule_save,
+        # automations can wait for a switch change to be applied on the router
+        on_apply_progress=lambda progress: hass.bus.async_fire(
+            EVENT_APPLY, {ATTR_ENTRY_ID: entry.entry_id, "host": entry.data.get("host"), **progress}
+        ),
+        max_body_size=max(
+            MIN_MAX_BODY_SIZE,
+            int(options.get(CONF_MAX_BODY_SIZE, DEFAULT_MAX_BODY_SIZE)),
+        )
+        * 1024,
     )
 
+    # Reuse the last session (or the one the config flow just opened) instead
+    # of logging in again; a rejected cookie falls back to a login.
+    pending = hass.data.get(DATA_PENDING_SESSIONS, {}).pop(entry.data.get("host"), None)
+    if hasattr(client, "restore_session"):
+        client.restore_session(store.data.get("session") or pending)
+        store.register("session", client.export_session)
+
     try:
         model = await detect_model(client)
     except Exception:
         _LOGGER.debug("Model detection failed, falling back to Generic", exc_info=True)
         model = "Generic"
 
-    integration = await registry.create_model_integration(model, hass, entry, client)
+    integration = await registry.create_model_integration(model, hass, entry, client, store=store)
 
     if hasattr(integration, "platforms") and getattr(integration, "platforms") is not None:
         platforms = list(getattr(integration, "platforms"))
@@ -70,8 +114,11 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {
         "client": client,
+        "store": store,
         "integration": integration,
         "coordinator": getattr(integration, "coordinator", None),
+        "coordinators": getattr(integration, "coordinators", None) or {},
+        "control_coordinator": getattr(integration, "control_coordinator", None),
         "platforms": platforms,
     }
 
@@ -80,11 +127,36 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     except Exception:
         _LOGGER.exception("Failed to forward platforms for hass_cudy_router")
 
+    _async_register_services(hass)
+
     return True
 
 
+def _async_register_services(hass: HomeAssistant) -> None:
+    if hass.services.has_service(DOMAIN, SERVICE_REDISCOVER_CAPABILITIES):
+        return
+
+    async def _async_rediscover(call: ServiceCall) -> None:
+        entry_id = call.data.get(ATTR_ENTRY_ID)
+        for eid, data in list(hass.data.get(DOMAIN, {}).items()):
+            if entry_id and eid != entry_id:
+                continue
+            fn = getattr(data.get("integration"), "async_rediscover_capabilities", None)
+            if callable(fn):
+                await fn()
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_REDISCOVER_CAPABILITIES,
+        _async_rediscover,
+        schema=REDISCOVER_SCHEMA,
+    )
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     data: dict[str, Any] | None = hass.data.get(DOMAIN, {}).pop(entry.entry_id, None)
+    if not hass.data.get(DOMAIN):
+        hass.services.async_remove(DOMAIN, SERVICE_REDISCOVER_CAPABILITIES)
     if not data:
         return True
 
@@ -106,4 +178,12 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             except Exception:
                 _LOGGER.debug("Error closing CudyClient", exc_info=True)
 
-    return True
\ No newline at end of file
+    return True
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Drop the persisted per-entry state when the entry is deleted."""
+    try:
+        await CudyStore(hass, entry.entry_id).async_remove()
+    except Exception:
+        _LOGGER.debug("Error removing stored state for hass_cudy_router", exc_info=True)
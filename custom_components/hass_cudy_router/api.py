@@ -1,17 +1,74 @@
 from __future__ import annotations
 
-from typing import Any
+import asyncio
+import copy
+import logging
+from typing import Any, Collection
 
-from aiohttp import ClientResponseError
+from aiohttp import ClientError, ClientResponseError
 
-from .client import CudyClient
+from .breaker import CircuitBreaker
+from .cache import CapabilityCache, ParseCache, UrlResolutionCache
+from .client import AuthenticationFailed, CudyClient, ResponseTooLarge
 from .const import *
+from .metrics import RequestMetrics
 from .parser import parse_html
+from .scheduler import Priority, request_priority
+
+_LOGGER = logging.getLogger(__name__)
 
 
 class CudyApi:
-    def __init__(self, client: CudyClient) -> None:
+    def __init__(
+        self,
+        client: CudyClient,
+        *,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        url_cache: UrlResolutionCache | None = None,
+        capabilities: CapabilityCache | None = None,
+        poll_budget: float | None = DEFAULT_POLL_BUDGET,
+    ) -> None:
         self._client = client
+        self._semaphore = asyncio.Semaphore(max(1, int(max_concurrency)))
+        self._url_cache = url_cache if url_cache is not None else UrlResolutionCache()
+        self._capabilities = capabilities if capabilities is not None else CapabilityCache()
+        self._parse_cache = ParseCache()
+        self._poll_budget = poll_budget
+        # Last data each module answered with: stands in for modules a poll
+        # ran out of time for.
+        self._last_good: dict[str, Any] = {}
+        # Last GSM payload seen: WAN enrichment needs it even when GSM is
+        # polled by another tier than WAN.
+        self._last_gsm: dict[str, Any] | None = None
+
+    @property
+    def url_cache(self) -> UrlResolutionCache:
+        return self._url_cache
+
+    @property
+    def capabilities(self) -> CapabilityCache:
+        return self._capabilities
+
+    @property
+    def parse_cache(self) -> ParseCache:
+        return self._parse_cache
+
+    @property
+    def metrics(self) -> RequestMetrics | None:
+        return getattr(self._client, "metrics", None)
+
+    @property
+    def breaker(self) -> CircuitBreaker | None:
+        return getattr(self._client, "breaker", None)
+
+    async def async_probe(self) -> bool:
+        """Cheap reachability check used while the breaker is open."""
+        return await self._client.async_probe()
+
+    def reset_capabilities(self) -> None:
+        """Forget learned URLs and absent modules: next poll probes everything."""
+        self._url_cache.clear()
+        self._capabilities.reset()
 
     @staticmethod
     def luci(path: str) -> str:
@@ -19,74 +76,225 @@ class CudyApi:
             path = "/" + path
         return "/cgi-bin/luci" + path
 
-    async def get_data(self) -> dict[str, Any]:
+    async def _get(self, path: str) -> Any:
+        # uhttpd on Cudy firmwares is single-threaded and slow: bound the number
+        # of requests we keep in flight against the router at any time.
+        async with self._semaphore:
+            return await self._client.get(path)
+
+    async def _fetch_module(self, module: str, urls: list[str]) -> dict[str, Any] | list[Any] | None:
+        # The system page is always there (model/firmware come from it): never
+        # let a transient empty answer mark it absent.
+        if module == MODULE_SYSTEM:
+            return await self._resolve_module(module, urls)
+
+        if not self._capabilities.should_fetch(module):
+            return None
+
+        data = await self._resolve_module(module, urls)
+        if data is None:
+            self._capabilities.record_miss(module)
+        else:
+            self._capabilities.record_hit(module)
+        return data
+
+    async def _resolve_module(self, module: str, urls: list[str]) -> dict[str, Any] | list[Any] | None:
+        # Known-good URL for this firmware first: one request per module
+        # (or just the fragments when the page is a known XHR shell)
+        cached = self._url_cache.get(module)
+        if cached is not None and cached in urls:
+            endpoints = self._url_cache.get_xhr(module)
+            if endpoints:
+                data = await self._fetch_fragments(module, endpoints)
+                # the shell may list different fragments now: re-read it too
+                skip = None
+            else:
+                data = await self._fetch_url(module, cached)
+                skip = cached
+            if data is not None:
+                return data
+            # Stale entry: forget it and re-probe the fallbacks once
+            self._url_cache.invalidate(module)
+        else:
+            skip = None
+
+        # Try multiple known URLs (firmware-dependent), in declared order
+        for url in urls:
+            if url == skip:
+                continue
+            data = await self._fetch_url(module, url)
+            if data is not None:
+                return data
+
+        return None
+
+    async def _fetch_url(self, module: str, url: str) -> dict[str, Any] | list[Any] | None:
+        try:
+            html = await self._get(self.luci(url))
+        except ClientResponseError:
+            return None
+        except ResponseTooLarge as err:
+            _LOGGER.warning("Skipping %s page: %s", module, err)
+            return None
+
+        if not html:
+            return None
+
+        data = self._parse_cache.parse(module, url, html, parse_html)
+
+        # Handle XHR "shell" pages: fetch real fragments and merge
+        if isinstance(data, dict) and "xhr_endpoints" in data:
+            xhr = data.get("xhr_endpoints") or {}
+            if not isinstance(xhr, dict) or not xhr:
+                return None
+            merged = await self._fetch_fragments(module, xhr)
+            if merged is not None:
+                self._url_cache.set(module, url, xhr=xhr)
+            return merged
+
+        # Accept non-empty dicts and non-empty lists
+        if isinstance(data, (dict, list)) and len(data) > 0:
+            self._url_cache.set(module, url)
+            return data
+        return None
+
+    async def _fetch_fragments(
+        self,
+        module: str,
+        endpoints: dict[str, dict[str, str]],
+    ) -> dict[str, Any] | None:
+        paths: list[str] = []
+        for ep, meta in endpoints.items():
+            args = ""
+            if isinstance(meta, dict):
+                args = meta.get("args", "") or ""
+            path = ep
+            if args:
+                # args is already a querystring
+                sep = "&" if "?" in path else "?"
+                path = f"{path}{sep}{args}"
+            paths.append(path)
+
+        # Fragments are fetched concurrently (still bounded by _get) but merged
+        # in endpoint order, so the result does not depend on response timing.
+        results = await asyncio.gather(*(self._fetch_fragment(module, path) for path in paths))
+
+        merged: dict[str, Any] = {}
+        for frag_data in results:
+            if not frag_data:
+                continue
+            for key, value in frag_data.items():
+                # a fragment that lacks a field must not blank what another one found
+                if value is not None or key not in merged:
+                    merged[key] = value
+        return merged or None
+
+    async def _fetch_fragment(self, module: str, path: str) -> dict[str, Any] | None:
+        try:
+            frag = await self._get(path)
+            if not frag:
+                return None
+            frag_data = self._parse_cache.parse(module, path, frag, parse_html)
+        except ClientResponseError:
+            return None
+        except Exception:
+            return None
+        return frag_data if isinstance(frag_data, dict) else None
+
+    async def get_data(
+        self,
+        modules: Collection[str] | None = None,
+        *,
+        budget: float | None = None,
+    ) -> dict[str, Any]:
+        """Fetch and parse router modules.
+
+        `modules` restricts the poll to a subset of CAPABILITY_URLS (one poll
+        tier); by default every known module is fetched. The whole poll gets
+        `budget` seconds (the api default if None): requests still running
+        then are cancelled and those modules keep their previous data, as do
+        modules whose requests failed (timeout, connection error). The poll
+        only fails if the login is refused or no module answered at all.
+        """
+        if budget is None:
+            budget = self._poll_budget
         out: dict[str, Any] = {}
 
-        for module, urls in CAPABILITY_URLS.items():
-            if not urls:
+        wanted = [
+            (module, urls)
+            for module, urls in CAPABILITY_URLS.items()
+            if urls and (modules is None or module in modules)
+        ]
+
+        # Modules are independent: fetch them concurrently (bounded by the
+        # semaphore in _get) while each module keeps its own fallback order.
+        tasks = [asyncio.ensure_future(self._fetch_module(module, urls)) for module, urls in wanted]
+        try:
+            if tasks:
+                await asyncio.wait(tasks, timeout=budget)
+        finally:
+            pending = [task for task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        timed_out: list[str] = []
+        failed: list[str] = []
+        first_error: BaseException | None = None
+        answered = False
+        for (module, _), task in zip(wanted, tasks):
+            if task.cancelled():
+                timed_out.append(module)
+            elif (err := task.exception()) is not None:
+                if isinstance(err, AuthenticationFailed) or not isinstance(err, Exception):
+                    raise err
+                # one module's timeout or error doesn't cost the others
+                failed.append(module)
+                first_error = first_error or err
+                if not isinstance(err, (ClientError, asyncio.TimeoutError)):
+                    _LOGGER.warning("Reading module %s failed", module, exc_info=err)
+            else:
+                answered = True
+                module_data = task.result()
+                if module_data is not None:
+                    self._last_good[module] = module_data
+                    out[module] = module_data
                 continue
+            if module in self._last_good:
+                out[module] = copy.deepcopy(self._last_good[module])
+
+        if first_error is not None and not answered:
+            # nothing got through: the router (or the link) is down
+            raise first_error
 
-            module_data: dict[str, Any] | list[Any] | None = None
-
-            # Try multiple known URLs (firmware-dependent)
-            for url in urls:
-                try:
-                    html = await self._client.get(self.luci(url))
-                except ClientResponseError:
-                    continue
-
-                if not html:
-                    continue
-
-                data = parse_html(module, html)
-
-                # Handle XHR "shell" pages: fetch real fragments and merge
-                if isinstance(data, dict) and "xhr_endpoints" in data:
-                    merged: dict[str, Any] = {}
-                    xhr = data.get("xhr_endpoints") or {}
-                    if isinstance(xhr, dict):
-                        for ep, meta in xhr.items():
-                            try:
-                                args = ""
-                                if isinstance(meta, dict):
-                                    args = meta.get("args", "") or ""
-                                path = ep
-                                if args:
-                                    # args is already a querystring
-                                    sep = "&" if "?" in path else "?"
-                                    path = f"{path}{sep}{args}"
-                                frag = await self._client.get(path)
-                                if not frag:
-                                    continue
-                                frag_data = parse_html(module, frag)
-                                if isinstance(frag_data, dict):
-                                    merged.update(frag_data)
-                            except ClientResponseError:
-                                continue
-                            except Exception:
-                                continue
-                    data = merged
-
-                # Accept non-empty dicts and non-empty lists
-                if isinstance(data, dict) and len(data) > 0:
-                    module_data = data
-                    break
-                if isinstance(data, list) and len(data) > 0:
-                    module_data = data
-                    break
-
-            if module_data is not None:
-                out[module] = module_data
+        if timed_out:
+            _LOGGER.debug(
+                "Poll budget of %ss exhausted, kept previous data for: %s",
+                budget,
+                ", ".join(timed_out),
+            )
+        if failed:
+            _LOGGER.debug("Requests failed (%r), kept previous data for: %s", first_error, ", ".join(failed))
+
+        system = out.get(MODULE_SYSTEM)
+        if isinstance(system, dict):
+            self._url_cache.set_firmware(system.get(SENSOR_SYSTEM_FIRMWARE_VERSION))
 
         # --- Heuristic enrichment for Cudy P4 5G/LTE firmwares -----------------
         # Some firmwares don't expose a classic WAN status page; the useful info
         # lives under GSM/4G (gcom). Map what we can so HA doesn't show
         # "Sconosciuto" everywhere.
         try:
-            gsm = out.get(MODULE_GSM)
+            if isinstance(out.get(MODULE_GSM), dict):
+                self._last_gsm = out[MODULE_GSM]
+            elif modules is None or MODULE_GSM in modules:
+                self._last_gsm = None
+
+            gsm = self._last_gsm
             wan = out.get(MODULE_WAN)
 
-            if isinstance(gsm, dict):
+            if isinstance(gsm, dict) and (modules is None or MODULE_WAN in modules):
                 if not isinstance(wan, dict):
                     wan = {}
                     out[MODULE_WAN] = wan
@@ -102,4 +310,5 @@ class CudyApi:
         return out
 
     async def reboot(self) -> None:
-        await self._client.post(self.luci("/admin/system/reboot"), data={"reboot": "1"})
\ No newline at end of file
+        with request_priority(Priority.WRITE):
+            await self._client.post(self.luci("/admin/system/reboot"), data={"reboot": "1"})
\ No newline at end of file
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Callable
+
+from .const import BREAKER_BACKOFF, BREAKER_THRESHOLD
+
+
+class CircuitBreaker:
+    """Stops polling a router that no longer answers at all.
+
+    `threshold` transport failures in a row open the breaker. While open only
+    a heartbeat is sent, following `backoff` (seconds): each failed heartbeat
+    moves to the next, longer step. Any answer from the router closes it.
+    """
+
+    def __init__(
+        self,
+        *,
+        threshold: int = BREAKER_THRESHOLD,
+        backoff: tuple[float, ...] = BREAKER_BACKOFF,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._threshold = max(1, int(threshold))
+        self._backoff = tuple(backoff) or (0.0,)
+        self._clock = clock
+        self._failures = 0
+        # backoff step and next heartbeat time, None while closed
+        self._step = 0
+        self._next_probe: float | None = None
+        self.opened = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self._next_probe is not None
+
+    @property
+    def retry_in(self) -> float:
+        """Seconds until the next heartbeat is due (0 while closed)."""
+        if self._next_probe is None:
+            return 0.0
+        return max(0.0, self._next_probe - self._clock())
+
+    def claim_probe(self) -> bool:
+        """True if a heartbeat is due; the caller is then the one sending it.
+
+        The slot is pushed back right away so concurrent polls of other tiers
+        don't probe the router at the same time.
+        """
+        if self._next_probe is None:
+            return False
+        now = self._clock()
+        if now < self._next_probe:
+            return False
+        self._next_probe = now + self._backoff[self._step]
+        return True
+
+    def record_success(self) -> bool:
+        """The router answered. True if that closed the breaker."""
+        was_open = self.is_open
+        self._failures = 0
+        self._step = 0
+        self._next_probe = None
+        return was_open
+
+    def record_failure(self) -> bool:
+        """No answer from the router. True if that opened the breaker."""
+        now = self._clock()
+        if self._next_probe is not None:
+            self._step = min(self._step + 1, len(self._backoff) - 1)
+            self._next_probe = now + self._backoff[self._step]
+            return False
+
+        self._failures += 1
+        if self._failures < self._threshold:
+            return False
+        self._failures = 0
+        self._step = 0
+        self._next_probe = now + self._backoff[0]
+        self.opened += 1
+        return True
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "state": "open" if self.is_open else "closed",
+            "consecutive_failures": self._failures,
+            "step": self._step if self.is_open else None,
+            "next_probe_in": round(self.retry_in, 1) if self.is_open else None,
+            "times_opened": self.opened,
+        }
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import copy
+import hashlib
+import re
+import time
+from typing import Any, Callable
+
+from .const import NEGATIVE_CACHE_BACKOFF, NEGATIVE_CACHE_THRESHOLD
+
+
+class UrlResolutionCache:
+    """Remembers which CAPABILITY_URLS fallback answered for each module.
+
+    A given firmware only ever answers on one of the known URLs, so once a
+    module resolved we go straight to that URL. Entries are scoped to the
+    router host and its firmware version: a firmware change drops them.
+    """
+
+    def __init__(
+        self,
+        host: str = "",
+        *,
+        on_change: Callable[[], None] | None = None,
+    ) -> None:
+        self._host = host or ""
+        self._firmware: str | None = None
+        self._urls: dict[str, str] = {}
+        # module -> cbi_xhr_load endpoints found on its shell page
+        self._xhr: dict[str, dict[str, dict[str, str]]] = {}
+        self._on_change = on_change
+
+    @property
+    def key(self) -> str:
+        return f"{self._host}|{self._firmware or ''}"
+
+    @property
+    def firmware(self) -> str | None:
+        return self._firmware
+
+    def get(self, module: str) -> str | None:
+        return self._urls.get(module)
+
+    def get_xhr(self, module: str) -> dict[str, dict[str, str]] | None:
+        return self._xhr.get(module)
+
+    def set(
+        self,
+        module: str,
+        url: str,
+        *,
+        xhr: dict[str, dict[str, str]] | None = None,
+    ) -> None:
+        if self._urls.get(module) == url and self._xhr.get(module) == xhr:
+            return
+        self._urls[module] = url
+        if xhr:
+            self._xhr[module] = xhr
+        else:
+            self._xhr.pop(module, None)
+        self._changed()
+
+    def invalidate(self, module: str) -> None:
+        had_xhr = self._xhr.pop(module, None) is not None
+        if self._urls.pop(module, None) is not None or had_xhr:
+            self._changed()
+
+    def set_firmware(self, firmware: str | None) -> None:
+        """Bind the cache to a firmware version.
+
+        The first firmware we learn adopts what was resolved so far (the very
+        first cycle runs before the system page told us the version). A later
+        change means an upgrade: URLs may have moved, start from scratch.
+        """
+        if not firmware or firmware == self._firmware:
+            return
+        if self._firmware is not None:
+            self._urls = {}
+            self._xhr = {}
+        self._firmware = firmware
+        self._changed()
+
+    def clear(self) -> None:
+        if not self._urls and not self._xhr:
+            return
+        self._urls = {}
+        self._xhr = {}
+        self._changed()
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "host": self._host,
+            "firmware": self._firmware,
+            "urls": dict(self._urls),
+            "xhr": {module: dict(endpoints) for module, endpoints in self._xhr.items()},
+        }
+
+    def load(self, data: Any) -> None:
+        if not isinstance(data, dict):
+            return
+        # Entries learned for another host are meaningless here
+        if (data.get("host") or "") != self._host:
+            return
+        urls = data.get("urls")
+        if isinstance(urls, dict):
+            self._urls = {str(k): str(v) for k, v in urls.items() if k and v}
+        xhr = data.get("xhr")
+        if isinstance(xhr, dict):
+            self._xhr = {
+                str(module): endpoints
+                for module, endpoints in xhr.items()
+                if module in self._urls and isinstance(endpoints, dict) and endpoints
+            }
+        firmware = data.get("firmware")
+        self._firmware = str(firmware) if firmware else None
+
+    def _changed(self) -> None:
+        if self._on_change is not None:
+            self._on_change()
+
+
+class CapabilityCache:
+    """Negative cache for modules the router does not expose.
+
+    A module that comes back empty `threshold` polls in a row is marked
+    absent and skipped; it is re-probed following `backoff` (seconds), each
+    failed re-probe moving to the next, longer step.
+    """
+
+    def __init__(
+        self,
+        *,
+        threshold: int = NEGATIVE_CACHE_THRESHOLD,
+        backoff: tuple[float, ...] = NEGATIVE_CACHE_BACKOFF,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._threshold = max(1, int(threshold))
+        self._backoff = tuple(backoff) or (0.0,)
+        self._clock = clock
+        self._misses: dict[str, int] = {}
+        # module -> (backoff step, next probe time)
+        self._absent: dict[str, tuple[int, float]] = {}
+
+    def should_fetch(self, module: str) -> bool:
+        absent = self._absent.get(module)
+        if absent is None:
+            return True
+        return self._clock() >= absent[1]
+
+    def is_absent(self, module: str) -> bool:
+        return module in self._absent
+
+    def record_hit(self, module: str) -> None:
+        self._misses.pop(module, None)
+        self._absent.pop(module, None)
+
+    def record_miss(self, module: str) -> None:
+        now = self._clock()
+        absent = self._absent.get(module)
+        if absent is not None:
+            step = min(absent[0] + 1, len(self._backoff) - 1)
+            self._absent[module] = (step, now + self._backoff[step])
+            return
+
+        misses = self._misses.get(module, 0) + 1
+        if misses >= self._threshold:
+            self._misses.pop(module, None)
+            self._absent[module] = (0, now + self._backoff[0])
+        else:
+            self._misses[module] = misses
+
+    def reset(self) -> None:
+        self._misses.clear()
+        self._absent.clear()
+
+    def as_dict(self) -> dict[str, Any]:
+        now = self._clock()
+        return {
+            module: {"step": step, "next_probe_in": max(0.0, round(next_probe - now, 1))}
+            for module, (step, next_probe) in self._absent.items()
+        }
+
+
+# LuCI embeds a per-session CSRF token in every form; it never feeds a sensor
+# but would make otherwise identical pages hash differently.
+_VOLATILE_RE = re.compile(rb'(name="token"\s+value=")[0-9a-fA-F]*(")')
+
+
+class ParseCache:
+    """Reuses the previous parse result of a page whose content did not change.
+
+    Static pages (system, lan, dhcp, wifi) are mostly byte-identical between
+    polls; hashing them is far cheaper than rebuilding a soup. Results are
+    handed out as copies since callers enrich them in place.
+    """
+
+    def __init__(self) -> None:
+        # (module, path) -> (digest, parse result)
+        self._entries: dict[tuple[str, str], tuple[bytes, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(html: str) -> bytes:
+        raw = _VOLATILE_RE.sub(rb"\1\2", html.encode("utf-8", "surrogateescape"))
+        return hashlib.blake2b(raw, digest_size=16).digest()
+
+    def parse(self, module: str, path: str, html: str, parser: Callable[[str, str], Any]) -> Any:
+        key = (module, path)
+        digest = self.digest(html)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == digest:
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+        self.misses += 1
+        data = parser(module, html)
+        self._entries[key] = (digest, copy.deepcopy(data))
+        return data
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    @property
+    def hit_rate(self) -> float | None:
+        total = self.hits + self.misses
+        return round(self.hits / total, 3) if total else None
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
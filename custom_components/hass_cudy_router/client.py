@@ -1,21 +1,67 @@
 from __future__ import annotations
 
 import asyncio
+import codecs
 import hashlib
+import json as jsonlib
 import logging
 import time
 import re
+from contextlib import asynccontextmanager
 from http.cookies import SimpleCookie
-from typing import Any, Optional
-from urllib.parse import quote_plus
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+from urllib.parse import quote_plus, urlsplit
 
 import aiohttp
 from aiohttp import ClientResponseError, ClientSession, TCPConnector
 from bs4 import BeautifulSoup
 
+from .breaker import CircuitBreaker
+from .cache import CapabilityCache
+from .const import (
+    DEFAULT_MAX_BODY_SIZE,
+    HEARTBEAT_TIMEOUT,
+    SERVICECTL_POLL_MAX,
+    SERVICECTL_POLL_MIN,
+    WRITE_BATCH_WINDOW,
+)
+from .metrics import RequestMetrics
+from .parser import make_soup
+from .scheduler import Priority, RequestScheduler, prioritized
+
 _LOGGER = logging.getLogger(__name__)
 
+# Seconds to establish a connection, to wait for each read, and overall cap
+# of one request. A poll as a whole is bounded by the api's poll budget.
+DEFAULT_CONNECT_TIMEOUT = 5
 DEFAULT_TIMEOUT = 10
+DEFAULT_TOTAL_TIMEOUT = 30
+# uhttpd handles few connections and closes idle ones after 20 s: keep a
+# small pool and drop idle sockets before the router does.
+DEFAULT_CONNECTION_LIMIT = 4
+KEEPALIVE_TIMEOUT = 15
+DNS_CACHE_TTL = 300
+# consecutive failed logins on the known-good scheme before trying the other
+SCHEME_REPROBE_AFTER = 3
+# bodies are read and decoded in chunks of this size
+READ_CHUNK_SIZE = 64 * 1024
+
+# no answer at all from the router, as opposed to an HTTP error
+_TRANSPORT_ERRORS = (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+# `_=<ms>` query parameter LuCI pages get to defeat browser caches
+_CACHE_BUSTER_RE = re.compile(r"([?&])_=\d+&?")
+
+
+class RouterUnavailable(aiohttp.ClientConnectionError):
+    """Raised instead of sending a request while the circuit breaker is open."""
+
+
+class AuthenticationFailed(RuntimeError):
+    """The router refused the configured credentials."""
+
+
+class ResponseTooLarge(aiohttp.ClientPayloadError):
+    """The router sent a body larger than the client's max_body_size."""
 
 
 class CudyClient:
@@ -28,7 +74,13 @@ class CudyClient:
         use_https: bool = False,
         verify_ssl: bool = True,
         request_timeout: int = DEFAULT_TIMEOUT,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
         session: ClientSession | None = None,
+        connection_limit: int = DEFAULT_CONNECTION_LIMIT,
+        on_session_change: Callable[[], None] | None = None,
+        on_apply_progress: Callable[[dict[str, Any]], None] | None = None,
+        scheduler: RequestScheduler | None = None,
+        max_body_size: int | None = DEFAULT_MAX_BODY_SIZE * 1024,
     ) -> None:
         self._host = host.rstrip("/")
         self._username = username
@@ -38,17 +90,62 @@ class CudyClient:
 
         self._external_session = session is not None
         self._session: Optional[ClientSession] = session
-        self._timeout = aiohttp.ClientTimeout(total=request_timeout)
+        # An unreachable router fails fast on connect instead of using up the
+        # whole read timeout.
+        self._timeout = aiohttp.ClientTimeout(
+            total=max(DEFAULT_TOTAL_TIMEOUT, request_timeout),
+            sock_connect=connect_timeout,
+            sock_read=request_timeout,
+        )
+        self._connection_limit = max(1, int(connection_limit))
+        # None or 0: no limit
+        self._max_body_size = max_body_size or None
 
         self._sysauth: str | None = None
+        # One login at a time per client; the generation is bumped on every
+        # successful login so a request that failed with an older cookie
+        # knows it only has to retry.
+        self._auth_lock = asyncio.Lock()
+        self._auth_generation = 0
+        self._login_page_reauths = 0
+
+        # scheme the last login succeeded on, when a session was obtained and
+        # how long the router kept the previous one alive (persisted)
+        self._scheme: str | None = None
+        self._scheme_failures = 0
+        self._session_obtained_at: float | None = None
+        self._session_lifetime: float | None = None
+        self._on_session_change = on_session_change
+        self._on_apply_progress = on_apply_progress
+        # service group -> progress of its latest restart
+        self.applies: dict[str, dict[str, Any]] = {}
+
+        self.metrics = RequestMetrics()
+        self.breaker = CircuitBreaker()
+        self.scheduler = scheduler if scheduler is not None else RequestScheduler()
+        # control page -> path (and query) of the URL that answered, without
+        # scheme/host so a scheme fallback doesn't strand it; pages
+        # none of the candidates serves are only re-probed on a back-off
+        self._control_pages: dict[str, str] = {}
+        self._control_absent = CapabilityCache(threshold=1)
+        # one submission at a time per CBI form; changes to a form made
+        # within WRITE_BATCH_WINDOW of each other are submitted together
+        self._form_locks: dict[str, asyncio.Lock] = {}
+        self._form_batches: dict[str, tuple[dict[str, Any], asyncio.Task[bool]]] = {}
 
     # ------------------------------------------------------------------
     # Properties
     # ------------------------------------------------------------------
+    @property
+    def scheme(self) -> str:
+        """The scheme the last login worked on, else the configured one."""
+        if self._scheme:
+            return self._scheme
+        return "https" if self._use_https else "http"
+
     @property
     def base_url(self) -> str:
-        scheme = "https" if self._use_https else "http"
-        return f"{scheme}://{self._host}"
+        return f"{self.scheme}://{self._host}"
 
     @property
     def is_authenticated(self) -> bool:
@@ -58,18 +155,120 @@ class CudyClient:
     def sysauth(self) -> str | None:
         return self._sysauth
 
+    @property
+    def auth_generation(self) -> int:
+        return self._auth_generation
+
+    @property
+    def login_page_reauths(self) -> int:
+        """Requests answered with the login page (expired session) so far."""
+        return self._login_page_reauths
+
     # ------------------------------------------------------------------
     # Session handling
     # ------------------------------------------------------------------
     async def _ensure_session(self) -> ClientSession:
         if self._session is None or self._session.closed:
-            connector = None
-            # allow self-signed certs when verify_ssl=False
-            if self._use_https and not self._verify_ssl:
-                connector = TCPConnector(ssl=False)
+            # One small keep-alive pool per router: a poll reuses the same
+            # TCP/TLS connections instead of a handshake per request.
+            connector = TCPConnector(
+                limit_per_host=self._connection_limit,
+                keepalive_timeout=KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=DNS_CACHE_TTL,
+                # allow self-signed certs when verify_ssl=False
+                ssl=self._verify_ssl,
+            )
             self._session = aiohttp.ClientSession(timeout=self._timeout, connector=connector)
         return self._session
 
+    @asynccontextmanager
+    async def _metered(
+        self, ctx: Any, method: str, url: str, *, retries: int = 0, gated: bool = True
+    ) -> AsyncIterator[Any]:
+        """Enter a session.get/post/request(...) context, recording its timings.
+
+        While the breaker is open nothing but the heartbeat (`gated=False`)
+        goes out; other requests fail right away with RouterUnavailable.
+        """
+        if gated and self.breaker.is_open:
+            self._discard(ctx)
+            raise RouterUnavailable(
+                f"Router {self._host} unreachable, next probe in {self.breaker.retry_in:.0f} s"
+            )
+        try:
+            await self.scheduler.acquire()
+        except BaseException:
+            self._discard(ctx)
+            raise
+        if method.upper() not in ("GET", "HEAD"):
+            self.scheduler.invalidate()
+
+        start = time.monotonic()
+        status: int | None = None
+        ttfb: float | None = None
+        resp: Any = None
+        try:
+            async with ctx as resp:
+                ttfb = time.monotonic() - start
+                status = resp.status
+                if self.breaker.record_success():
+                    _LOGGER.info("Router %s is reachable again, resuming polls", self._host)
+                yield resp
+        except BaseException as err:
+            if status is None and isinstance(err, _TRANSPORT_ERRORS) and self.breaker.record_failure():
+                _LOGGER.warning(
+                    "Router %s is not answering, pausing polls until it does (%s)",
+                    self._host,
+                    err or type(err).__name__,
+                )
+            # failed mid-body: not a successful request, keep HTTP errors as is
+            if status is not None and status < 400:
+                status = None
+            raise
+        finally:
+            size = getattr(getattr(resp, "content", None), "total_bytes", None)
+            self.metrics.record_request(
+                method,
+                url,
+                status=status,
+                size=size if isinstance(size, int) else None,
+                ttfb=ttfb,
+                latency=time.monotonic() - start,
+                retries=retries,
+            )
+
+    @staticmethod
+    def _discard(ctx: Any) -> None:
+        """Drop a request context that will never be entered."""
+        close = getattr(ctx, "close", None)
+        if close is not None:
+            close()
+
+    async def async_probe(self) -> bool:
+        """Heartbeat: one unauthenticated HEAD on the LuCI root.
+
+        Any HTTP answer means the router is back; it goes out even with the
+        breaker open and its outcome feeds the breaker like any request.
+        """
+        session = await self._ensure_session()
+        url = f"{self.base_url}/cgi-bin/luci"
+        try:
+            async with self._metered(
+                session.head(
+                    url,
+                    headers={"User-Agent": "hass-cudy-router"},
+                    allow_redirects=False,
+                    timeout=aiohttp.ClientTimeout(total=HEARTBEAT_TIMEOUT),
+                ),
+                "HEAD",
+                url,
+                gated=False,
+            ):
+                return True
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+            _LOGGER.debug("Heartbeat to %s failed: %s", self._host, err or type(err).__name__)
+            return False
+
     async def async_close(self) -> None:
         """Close the aiohttp session (called on HA unload)."""
         if self._session and not self._session.closed and not self._external_session:
@@ -84,12 +283,80 @@ class CudyClient:
     # Authentication (LuCI)
     # ------------------------------------------------------------------
     async def authenticate(self) -> bool:
-        """Authenticate using the LuCI login form and set sysauth cookie."""
+        """Authenticate using the LuCI login form and set sysauth cookie.
 
+        Concurrent callers share a single login.
+        """
+        return await self._authenticate_once(self._auth_generation)
+
+    async def _authenticate_once(self, generation: int) -> bool:
+        """Log in unless someone already did since `generation` was read."""
+        async with self._auth_lock:
+            if generation != self._auth_generation and self._sysauth:
+                return True
+            return await self._login()
+
+    def _set_sysauth(self, sysauth: str, *, obtained_at: float | None = None) -> None:
+        self._sysauth = sysauth
+        self._auth_generation += 1
+        self._session_obtained_at = obtained_at if obtained_at is not None else time.time()
+        if self._on_session_change is not None:
+            self._on_session_change()
+
+    def _login_succeeded(self, scheme: str) -> None:
+        if scheme != self.scheme:
+            _LOGGER.info("Router %s answers over %s, using it from now on", self._host, scheme)
+        self._scheme = scheme
+        self._scheme_failures = 0
+
+    def _session_rejected(self, generation: int) -> None:
+        """The router refused the cookie of `generation`: note how long it lived."""
+        if generation != self._auth_generation or self._session_obtained_at is None:
+            return
+        self._session_lifetime = max(0.0, time.time() - self._session_obtained_at)
+
+    # ------------------------------------------------------------------
+    # Session persistence
+    # ------------------------------------------------------------------
+    def export_session(self) -> dict[str, Any] | None:
+        """Current sysauth session, to be reused after a restart."""
+        if not self._sysauth:
+            return None
+        return {
+            "host": self._host,
+            "sysauth": self._sysauth,
+            "scheme": self._scheme,
+            "obtained_at": self._session_obtained_at,
+            "lifetime": self._session_lifetime,
+        }
+
+    def restore_session(self, data: Any) -> bool:
+        """Reuse a stored session; the first rejected request logs in again."""
+        if not isinstance(data, dict) or data.get("host") != self._host:
+            return False
+        if data.get("scheme") in ("http", "https"):
+            self._scheme = data["scheme"]
+        lifetime = data.get("lifetime")
+        if isinstance(lifetime, (int, float)):
+            self._session_lifetime = float(lifetime)
+
+        sysauth = data.get("sysauth")
+        obtained_at = data.get("obtained_at")
+        if not sysauth or not isinstance(obtained_at, (int, float)):
+            return False
+        if self._session_lifetime is not None and time.time() >= obtained_at + self._session_lifetime:
+            # already past the lifetime we saw last time: don't bother trying it
+            return False
+        self._set_sysauth(str(sysauth), obtained_at=float(obtained_at))
+        return True
+
+    async def _login(self) -> bool:
         session = await self._ensure_session()
 
-        # try preferred scheme first, then fallback
-        schemes = ["https", "http"] if self._use_https else ["http", "https"]
+        schemes = self._login_schemes()
+        # every attempt stopped by the open circuit breaker: the router is
+        # down, which says nothing about the credentials or the scheme
+        unavailable = True
 
         for scheme in schemes:
             base = f"{scheme}://{self._host}"
@@ -109,17 +376,24 @@ class CudyClient:
 
             # 1) GET login page
             try:
-                async with session.get(login_url, headers=headers_get, allow_redirects=True) as resp:
-                    html = await resp.text()
+                async with self._metered(
+                    session.get(login_url, headers=headers_get, allow_redirects=True), "GET", login_url
+                ) as resp:
+                    html = await self._read_text(resp)
+            except RouterUnavailable as e:
+                _LOGGER.debug("GET login page skipped (%s): %s", scheme, e)
+                continue
             except Exception as e:
-                _LOGGER.error("GET login page failed (%s): %s", scheme, e)
+                unavailable = False
+                _LOGGER.debug("GET login page failed (%s): %s", scheme, e)
                 continue
+            unavailable = False
 
             if not html:
-                _LOGGER.error("GET login page failed (%s): empty response", scheme)
+                _LOGGER.debug("GET login page failed (%s): empty response", scheme)
                 continue
 
-            soup = BeautifulSoup(html, "html.parser")
+            soup = make_soup(html)
 
             def extract(name: str) -> str:
                 tag = soup.find("input", {"name": name})
@@ -160,32 +434,57 @@ class CudyClient:
             encoded = "&".join(f"{quote_plus(k)}={quote_plus(str(v))}" for k, v in body.items())
 
             try:
-                async with session.post(
+                async with self._metered(
+                    session.post(
+                        login_url,
+                        headers=headers_post,
+                        data=encoded,
+                        allow_redirects=False,
+                    ),
+                    "POST",
                     login_url,
-                    headers=headers_post,
-                    data=encoded,
-                    allow_redirects=False,
                 ) as resp:
                     # try Set-Cookie header first
                     set_cookie = resp.headers.getall("Set-Cookie", [])
                     sysauth = self._parse_sysauth_from_headers(set_cookie)
                     if sysauth:
-                        self._sysauth = sysauth
+                        self._login_succeeded(scheme)
+                        self._set_sysauth(sysauth)
                         return True
 
                     # fallback to cookie jar
                     jar = session.cookie_jar.filter_cookies(base)
                     for key, cookie in jar.items():
                         if key.lower().startswith("sysauth") and cookie.value:
-                            self._sysauth = cookie.value
+                            self._login_succeeded(scheme)
+                            self._set_sysauth(cookie.value)
                             return True
             except Exception as e:
-                _LOGGER.error("POST login failed (%s): %s", scheme, e)
+                _LOGGER.debug("POST login failed (%s): %s", scheme, e)
                 continue
 
-        _LOGGER.debug("Authentication failed: no sysauth cookie obtained")
+        if unavailable:
+            _LOGGER.debug("Not logging in to %s: router unreachable", self._host)
+            return False
+
+        self._scheme_failures += 1
+        _LOGGER.warning(
+            "Authentication to %s failed over %s: no sysauth cookie obtained",
+            self._host,
+            "/".join(schemes),
+        )
         return False
 
+    def _login_schemes(self) -> list[str]:
+        preferred = self.scheme
+        other = "http" if preferred == "https" else "https"
+        # Until a scheme worked probe both; afterwards stick to it and only
+        # try the other one again after repeated failed logins, instead of
+        # paying a connect timeout on every re-login.
+        if self._scheme is None or self._scheme_failures >= SCHEME_REPROBE_AFTER:
+            return [preferred, other]
+        return [preferred]
+
     @staticmethod
     def _parse_sysauth_from_headers(set_cookie_headers: list[str]) -> str | None:
         for hdr in set_cookie_headers:
@@ -201,7 +500,7 @@ class CudyClient:
         if not self.is_authenticated:
             ok = await self.authenticate()
             if not ok:
-                raise RuntimeError("Authentication failed")
+                raise AuthenticationFailed("Authentication failed")
 
     # ------------------------------------------------------------------
     # Generic request helpers
@@ -216,58 +515,179 @@ class CudyClient:
         data: Any = None,
         require_auth: bool = True,
     ) -> Any:
-        """Low-level request helper used by get/post and APIs."""
+        """Low-level request helper used by get/post and APIs.
+
+        Plain GETs of the same path are shared through the scheduler.
+        """
 
         if not path.startswith("/"):
             path = "/" + path
 
+        if method.upper() == "GET" and json is None and data is None:
+            key = ("GET", path, tuple(sorted((params or {}).items())), require_auth)
+            return await self.scheduler.coalesce(
+                key,
+                lambda: self._request(method, path, params=params, require_auth=require_auth),
+            )
+        return await self._request(method, path, params=params, json=json, data=data, require_auth=require_auth)
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: dict[str, Any] | None = None,
+        json: Any = None,
+        data: Any = None,
+        require_auth: bool = True,
+    ) -> Any:
         if require_auth:
             await self.ensure_authenticated()
+        generation = self._auth_generation
 
         session = await self._ensure_session()
         url = f"{self.base_url}{path}"
 
+        async with self._metered(
+            session.request(
+                method,
+                url,
+                params=params,
+                json=json,
+                data=data,
+                headers=self._request_headers(),
+            ),
+            method,
+            url,
+        ) as resp:
+            if resp.status != 403 or not require_auth:
+                try:
+                    resp.raise_for_status()
+                except ClientResponseError:
+                    return ""
+
+                body = await self._read_body(resp)
+                if not (require_auth and self._is_login_page(resp, body)):
+                    return body
+
+                # Many firmwares answer an expired session with 200 + the login form
+                self._login_page_reauths += 1
+                _LOGGER.debug("Session expired (login page served for %s), logging in again", path)
+
+        self._session_rejected(generation)
+
+        # Only the first request rejected with this cookie logs in again, the
+        # others wait for it and retry with the new one
+        await self._authenticate_once(generation)
+        async with self._metered(
+            session.request(
+                method,
+                url,
+                params=params,
+                json=json,
+                data=data,
+                headers=self._request_headers(),
+            ),
+            method,
+            url,
+            retries=1,
+        ) as resp2:
+            resp2.raise_for_status()
+            return await self._read_body(resp2)
+
+    def _request_headers(self) -> dict[str, str]:
         headers: dict[str, str] = {
             "User-Agent": "hass-cudy-router",
             "Accept": "*/*",
         }
         if self.sysauth:
             headers["Cookie"] = f"sysauth={self.sysauth}"
+        return headers
 
-        async with session.request(
-            method,
-            url,
-            params=params,
-            json=json,
-            data=data,
-            headers=headers,
-        ) as resp:
-            if resp.status == 403 and require_auth:
-                await self.authenticate()
-                headers["Cookie"] = f"sysauth={self.sysauth}" if self.sysauth else ""
-                async with session.request(
-                    method,
-                    url,
-                    params=params,
-                    json=json,
-                    data=data,
-                    headers=headers,
-                ) as resp2:
-                    resp2.raise_for_status()
-                    ctype = resp2.headers.get("Content-Type", "")
-                    if "application/json" in ctype:
-                        return await resp2.json(content_type=None)
-                    return await resp2.text()
+    async def _read_body(self, resp: Any) -> Any:
+        ctype = resp.headers.get("Content-Type", "")
+        text = await self._read_text(resp)
+        if "application/json" in ctype:
+            return jsonlib.loads(text) if text.strip() else None
+        return text
 
-            try:
+    async def _read_text(self, resp: Any) -> str:
+        """Stream the body and decode it chunk by chunk, up to max_body_size.
+
+        Unlike resp.text() the raw bytes are never held in full next to the
+        decoded page, and a runaway body is cut off instead of filling memory.
+        """
+        limit = self._max_body_size
+        length = getattr(resp, "content_length", None)
+        if limit and length is not None and length > limit:
+            raise ResponseTooLarge(f"{resp.url}: {length} bytes announced, limit is {limit}")
+
+        charset = getattr(resp, "charset", None) or "utf-8"
+        try:
+            decoder = codecs.getincrementaldecoder(charset)(errors="replace")
+        except LookupError:
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+        parts: list[str] = []
+        size = 0
+        async for chunk in resp.content.iter_chunked(READ_CHUNK_SIZE):
+            size += len(chunk)
+            if limit and size > limit:
+                raise ResponseTooLarge(f"{resp.url}: body exceeds the {limit} bytes limit")
+            parts.append(decoder.decode(chunk))
+        parts.append(decoder.decode(b"", final=True))
+        return "".join(parts)
+
+    async def _get_page(self, url: str, headers: dict[str, str]) -> str:
+        """GET a LuCI page for the form helpers, with _request's re-login.
+
+        A 403 or the login form served in place of the page logs in again
+        (once for all concurrent callers) and retries with the new cookie.
+        """
+        session = await self._ensure_session()
+        generation = self._auth_generation
+
+        def _headers() -> dict[str, str]:
+            out = dict(headers)
+            if self.sysauth:
+                out["Cookie"] = f"sysauth={self.sysauth}"
+            return out
+
+        async with self._metered(
+            session.get(url, headers=_headers(), allow_redirects=True), "GET", url
+        ) as resp:
+            if resp.status != 403:
                 resp.raise_for_status()
-            except ClientResponseError:
-                return ""
+                html = await self._read_text(resp)
+                if not self._is_login_page(resp, html):
+                    return html
+                self._login_page_reauths += 1
+                _LOGGER.debug("Session expired (login page served for %s), logging in again", url)
+
+        self._session_rejected(generation)
+        if not await self._authenticate_once(generation):
+            raise AuthenticationFailed("Authentication failed")
+        async with self._metered(
+            session.get(url, headers=_headers(), allow_redirects=True), "GET", url, retries=1
+        ) as resp2:
+            resp2.raise_for_status()
+            html = await self._read_text(resp2)
+            if self._is_login_page(resp2, html):
+                raise AuthenticationFailed(f"Session rejected right after logging in: {url}")
+            return html
 
-            ctype = resp.headers.get("Content-Type", "")
-            if "application/json" in ctype:
-                return await resp.json(content_type=None)
-            return await resp.text()
+    @staticmethod
+    def _is_login_page(resp: Any, body: Any) -> bool:
+        """Cheap check for the LuCI login form served in place of a page."""
+        if not isinstance(body, str):
+            return False
+        if "luci_password" in body:
+            return True
+        # or a redirect back to the bare LuCI root
+        url = getattr(resp, "url", None)
+        if getattr(resp, "history", None) and url is not None:
+            return url.path.rstrip("/") == "/cgi-bin/luci"
+        return False
 
     async def get(self, path: str, **kwargs: Any) -> Any:
         return await self.request("GET", path, **kwargs)
@@ -305,7 +725,7 @@ class CudyClient:
             return None
         # 1) classic hidden input
         try:
-            soup = BeautifulSoup(html, "html.parser")
+            soup = make_soup(html)
             inp = soup.find("input", {"name": "token"})
             if inp and inp.has_attr("value"):
                 t = str(inp["value"]).strip()
@@ -320,7 +740,11 @@ class CudyClient:
         return None
 
     async def _servicectl_restart(self, services: str, token: str, *, timeout_s: int = 35) -> bool:
-        """Restart services via Cudy OEM endpoint and wait for finish."""
+        """Restart services via Cudy OEM endpoint and wait for finish.
+
+        The status is checked often at first (most restarts are quick), then
+        less and less often; progress is reported through on_apply_progress.
+        """
         await self.ensure_authenticated()
         session = await self._ensure_session()
 
@@ -346,31 +770,131 @@ class CudyClient:
             headers_post["Cookie"] = f"sysauth={self.sysauth}"
             headers_get["Cookie"] = f"sysauth={self.sysauth}"
 
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self._apply_progress(services, "started", started, 0, timeout_s)
+
         # Start restart
         try:
-            async with session.post(svc_url, data={"token": token}, headers=headers_post, allow_redirects=True) as r:
-                _ = await r.text()
+            async with self._metered(
+                session.post(svc_url, data={"token": token}, headers=headers_post, allow_redirects=True),
+                "POST",
+                svc_url,
+            ) as r:
+                _ = await self._read_text(r)
                 if r.status >= 400:
                     _LOGGER.debug("servicectl restart %s failed status=%s", services, r.status)
-                    return False
+                    return self._apply_done(services, started, 0, False)
         except Exception as e:
             _LOGGER.debug("servicectl restart %s exception: %s", services, e)
-            return False
+            return self._apply_done(services, started, 0, False)
 
         # Poll status until 'finish'
-        deadline = time.time() + float(timeout_s)
-        while time.time() < deadline:
+        deadline = started + float(timeout_s)
+        delay = SERVICECTL_POLL_MIN
+        polls = 0
+        while (remaining := deadline - loop.time()) > 0:
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 1.5, SERVICECTL_POLL_MAX)
+            polls += 1
             try:
-                async with session.get(st_url, headers=headers_get, allow_redirects=True) as r2:
-                    txt = (await r2.text()).strip().lower()
+                async with self._metered(
+                    session.get(st_url, headers=headers_get, allow_redirects=True), "GET", st_url
+                ) as r2:
+                    txt = (await self._read_text(r2)).strip().lower()
                     if txt == "finish":
-                        return True
+                        return self._apply_done(services, started, polls, True)
             except Exception:
                 pass
-            await asyncio.sleep(1)
+            self._apply_progress(services, "waiting", started, polls, timeout_s)
+
+        _LOGGER.debug("servicectl status timeout for %s after %d checks", services, polls)
+        return self._apply_done(services, started, polls, False)
+
+    def _apply_progress(self, services: str, stage: str, started: float, polls: int, timeout_s: float) -> None:
+        elapsed = asyncio.get_running_loop().time() - started
+        # how far along, judged by how long this group usually takes
+        expected = self.metrics.apply_percentile(services, 50) or float(timeout_s)
+        self._report_apply(
+            {
+                "services": services,
+                "stage": stage,
+                "elapsed": round(elapsed, 2),
+                "progress": round(min(0.99, elapsed / expected), 2) if expected > 0 else 0.0,
+                "polls": polls,
+            }
+        )
 
-        _LOGGER.debug("servicectl status timeout for %s", services)
-        return False
+    def _apply_done(self, services: str, started: float, polls: int, success: bool) -> bool:
+        duration = asyncio.get_running_loop().time() - started
+        self.metrics.record_apply(services, duration, success)
+        self._report_apply(
+            {
+                "services": services,
+                "stage": "finished" if success else "failed",
+                "elapsed": round(duration, 2),
+                "progress": 1.0 if success else None,
+                "polls": polls,
+                "duration": round(duration, 2),
+            }
+        )
+        return success
+
+    def _report_apply(self, progress: dict[str, Any]) -> None:
+        self.applies[progress["services"]] = progress
+        if self._on_apply_progress is not None:
+            try:
+                self._on_apply_progress(dict(progress))
+            except Exception:  # never let a listener break the apply
+                _LOGGER.exception("Apply progress listener failed")
+
+    # ------------------------------------------------------------------
+    # Form writes
+    # ------------------------------------------------------------------
+    def _form_lock(self, form: str) -> asyncio.Lock:
+        return self._form_locks.setdefault(form, asyncio.Lock())
+
+    async def _batched_write(
+        self,
+        form: str,
+        changes: dict[str, Any],
+        submit: Callable[[dict[str, Any]], Awaitable[bool]],
+    ) -> bool:
+        """Submit `changes` to `form`, merged with the ones made meanwhile.
+
+        Changes made to the same form within WRITE_BATCH_WINDOW of the first
+        one are submitted all at once, by a task of their own; every caller
+        gets that submission's result or error. Later changes to the same
+        key override earlier ones. Different forms don't wait on each other.
+        """
+        batch = self._form_batches.get(form)
+        if batch is None:
+            # the submission runs on its own: a caller giving up (switch
+            # timeout) must not drop the changes the others queued with it
+            pending: dict[str, Any] = {}
+            task = asyncio.get_running_loop().create_task(self._flush_batch(form, pending, submit))
+            # retrieved here in case every caller gave up waiting for it
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            batch = self._form_batches[form] = (pending, task)
+        batch[0].update(changes)
+        return await asyncio.shield(batch[1])
+
+    async def _flush_batch(
+        self,
+        form: str,
+        pending: dict[str, Any],
+        submit: Callable[[dict[str, Any]], Awaitable[bool]],
+    ) -> bool:
+        try:
+            await asyncio.sleep(WRITE_BATCH_WINDOW)
+            async with self._form_lock(form):
+                # from here on changes go into the next batch
+                self._form_batches.pop(form, None)
+                return await submit(pending)
+        finally:
+            batch = self._form_batches.get(form)
+            if batch is not None and batch[1] is asyncio.current_task():
+                del self._form_batches[form]
 
     # ------------------------------------------------------------------
     # Wi-Fi control (Cudy custom UI / JSON endpoint)
@@ -378,6 +902,7 @@ class CudyClient:
     # ------------------------------------------------------------------
     # Wi-Fi control (Cudy LuCI CBI form)
     # ------------------------------------------------------------------
+    @prioritized(Priority.WRITE)
     async def async_set_wifi(self, *args) -> bool:
         """
         Compat:
@@ -411,6 +936,13 @@ class CudyClient:
             # default safe
             band = "2g"
 
+        # Both bands live in the same form: toggles made together (e.g. an
+        # automation turning both radios off) go out as one POST and one
+        # wireless restart.
+        return await self._batched_write("wifi", {band: enabled}, self._submit_wifi)
+
+    async def _submit_wifi(self, changes: dict[str, bool]) -> bool:
+        """One GET -> POST -> servicectl round of the uncombine form for `changes` (band -> enabled)."""
         await self.ensure_authenticated()
         session = await self._ensure_session()
 
@@ -428,9 +960,11 @@ class CudyClient:
             headers_get["Cookie"] = f"sysauth={self.sysauth}"
 
         try:
-            async with session.get(get_url, headers=headers_get, allow_redirects=True) as resp:
+            async with self._metered(
+                session.get(get_url, headers=headers_get, allow_redirects=True), "GET", get_url
+            ) as resp:
                 status = resp.status
-                html = await resp.text()
+                html = await self._read_text(resp)
         except Exception as e:
             _LOGGER.error("Wi-Fi GET uncombine exception: %s", e)
             return False
@@ -439,7 +973,7 @@ class CudyClient:
             _LOGGER.error("Wi-Fi GET uncombine failed status=%s", status)
             return False
 
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html)
         form = soup.find("form", {"name": "cbi"}) or soup.find("form")
         if not form:
             _LOGGER.error("Wi-Fi form not found on uncombine head=%r", html[:200])
@@ -494,22 +1028,16 @@ class CudyClient:
             ):
                 payload.pop(k, None)
 
-        # 4) Preserva entrambi i flag e modifica solo quello richiesto
+        # 4) Preserva entrambi i flag e modifica solo quelli richiesti
         # disabled: 0 = enabled, 1 = disabled
-        disabled_val = "0" if enabled else "1"
-
-        cur_2g = payload.get("cbid.wireless.wlan00.disabled", "0")
-        cur_5g = payload.get("cbid.wireless.wlan10.disabled", "0")
-
         payload["cbi.cbe.wireless.wlan00.disabled"] = payload.get("cbi.cbe.wireless.wlan00.disabled", "1")
         payload["cbi.cbe.wireless.wlan10.disabled"] = payload.get("cbi.cbe.wireless.wlan10.disabled", "1")
 
-        if band == "2g":
-            payload["cbid.wireless.wlan00.disabled"] = disabled_val
-            payload["cbid.wireless.wlan10.disabled"] = cur_5g
-        else:  # "5g"
-            payload["cbid.wireless.wlan10.disabled"] = disabled_val
-            payload["cbid.wireless.wlan00.disabled"] = cur_2g
+        for band, field in (("2g", "cbid.wireless.wlan00.disabled"), ("5g", "cbid.wireless.wlan10.disabled")):
+            if band in changes:
+                payload[field] = "0" if changes[band] else "1"
+            else:
+                payload[field] = payload.get(field, "0")
 
         # flags submit/apply (come browser)
         payload["cbi.submit"] = payload.get("cbi.submit", "1")
@@ -534,12 +1062,15 @@ class CudyClient:
             formdata.add_field(k, str(v))
 
         try:
-            async with session.post(post_url, headers=headers_post, data=formdata, allow_redirects=True) as resp2:
-                body2 = await resp2.text()
+            async with self._metered(
+                session.post(post_url, headers=headers_post, data=formdata, allow_redirects=True),
+                "POST",
+                post_url,
+            ) as resp2:
+                body2 = await self._read_text(resp2)
                 _LOGGER.debug(
-                    "Wi-Fi POST uncombine band=%s enabled=%s -> wlan00=%s wlan10=%s status=%s head=%r",
-                    band,
-                    enabled,
+                    "Wi-Fi POST uncombine changes=%s -> wlan00=%s wlan10=%s status=%s head=%r",
+                    changes,
                     payload.get("cbid.wireless.wlan00.disabled"),
                     payload.get("cbid.wireless.wlan10.disabled"),
                     resp2.status,
@@ -553,6 +1084,9 @@ class CudyClient:
                 if tok:
                     ok_apply = await self._servicectl_restart('wireless,vlan', tok, timeout_s=35)
                     _LOGGER.debug('Wi-Fi servicectl apply wireless,vlan -> %s', ok_apply)
+                    if not ok_apply:
+                        # saved but not applied (restart failed or timed out)
+                        return False
                 else:
                     _LOGGER.debug('Wi-Fi servicectl token not found; skipping servicectl apply')
         except Exception as e:
@@ -561,6 +1095,7 @@ class CudyClient:
 
         return True
 
+    @prioritized(Priority.INTERACTIVE)
     async def async_get_wifi_state(self) -> dict[str, bool]:
         """
         Legge lo stato reale dal router (Smart Connect OFF / uncombine):
@@ -569,7 +1104,6 @@ class CudyClient:
         Ritorna: {"2g": True/False, "5g": True/False}
         """
         await self.ensure_authenticated()
-        session = await self._ensure_session()
 
         ts = int(time.time() * 1000)
         url = f"{self.base_url}/cgi-bin/luci/admin/network/wireless/config/uncombine?embedded=&nomodal=&_={ts}"
@@ -580,14 +1114,15 @@ class CudyClient:
             "X-Requested-With": "XMLHttpRequest",
             "Referer": f"{self.base_url}/cgi-bin/luci/admin/setup",
         }
-        if self.sysauth:
-            headers_get["Cookie"] = f"sysauth={self.sysauth}"
 
-        async with session.get(url, headers=headers_get, allow_redirects=True) as resp:
-            resp.raise_for_status()
-            html = await resp.text()
+        async def fetch() -> str:
+            return await self._get_page(url, headers_get)
+
+        # both band switches refresh at the same time; not the "form" key
+        # namespace, whose reads answer (html, soup, form, url) tuples
+        html = await self.scheduler.coalesce(("wifi_html", self._strip_cache_buster(url)), fetch)
 
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html)
 
         def _val(name: str) -> str | None:
             inp = soup.find("input", {"name": name})
@@ -620,14 +1155,27 @@ class CudyClient:
     _ZEROTIER_PROTO_VALUES = {"zerotier", "zerotiers"}
     _WIREGUARD_PROTO_VALUES = {"wireguard", "wireguards"}
 
+    @staticmethod
+    def _strip_cache_buster(url: str) -> str:
+        return _CACHE_BUSTER_RE.sub(r"\1", url).rstrip("?&")
+
     async def _fetch_luci_form(
         self,
         urls: list[str],
         *,
         referer: str,
+    ) -> tuple[str, BeautifulSoup, Any, str]:
+        # The VPN and ZeroTier switches read the same pages
+        key = ("form", *(self._strip_cache_buster(url) for url in urls))
+        return await self.scheduler.coalesce(key, lambda: self._fetch_luci_form_once(urls, referer=referer))
+
+    async def _fetch_luci_form_once(
+        self,
+        urls: list[str],
+        *,
+        referer: str,
     ) -> tuple[str, BeautifulSoup, Any, str]:
         await self.ensure_authenticated()
-        session = await self._ensure_session()
 
         headers = {
             "User-Agent": "hass-cudy-router",
@@ -635,25 +1183,25 @@ class CudyClient:
             "X-Requested-With": "XMLHttpRequest",
             "Referer": referer,
         }
-        if self.sysauth:
-            headers["Cookie"] = f"sysauth={self.sysauth}"
 
         last_err: Exception | None = None
         for url in urls:
             try:
-                async with session.get(url, headers=headers, allow_redirects=True) as resp:
-                    html = await resp.text()
+                html = await self._get_page(url, headers)
                 if not html:
                     raise RuntimeError(f"Empty page: {url}")
-                soup = BeautifulSoup(html, "html.parser")
+                soup = make_soup(html)
                 form = soup.find("form", {"name": "cbi"}) or soup.find("form")
                 if not form:
                     raise RuntimeError(f"CBI form not found in {url}")
                 return html, soup, form, url
+            except AuthenticationFailed:
+                # no other candidate will do better
+                raise
             except Exception as e:
                 last_err = e
                 continue
-        raise RuntimeError(f"Unable to fetch LuCI form: {last_err}")
+        raise RuntimeError(f"Unable to fetch LuCI form: {last_err}") from last_err
 
     @staticmethod
     def _form_value(form: Any, name: str) -> str | None:
@@ -736,8 +1284,12 @@ class CudyClient:
         for k, v in fields.items():
             formdata.add_field(k, str(v))
 
-        async with session.post(post_url, data=formdata, headers=headers_post, allow_redirects=False) as resp:
-            body = await resp.text()
+        async with self._metered(
+            session.post(post_url, data=formdata, headers=headers_post, allow_redirects=False),
+            "POST",
+            post_url,
+        ) as resp:
+            body = await self._read_text(resp)
             loc = resp.headers.get("Location")
             status = resp.status
 
@@ -753,13 +1305,16 @@ class CudyClient:
 
         if follow_url:
             try:
-                async with session.get(follow_url, headers=headers_get, allow_redirects=True) as resp2:
-                    body = await resp2.text()
+                async with self._metered(
+                    session.get(follow_url, headers=headers_get, allow_redirects=True), "GET", follow_url
+                ) as resp2:
+                    body = await self._read_text(resp2)
             except Exception as e:
                 _LOGGER.debug("Follow apply URL failed (%s): %s", follow_url, e)
 
         return True, body
 
+    @prioritized(Priority.INTERACTIVE)
     async def async_get_vpn_state(self) -> dict[str, bool]:
         """Ritorna lo stato del WireGuard switch.
 
@@ -811,7 +1366,14 @@ class CudyClient:
             return {"wireguard": True}
         return {"wireguard": False}
 
+    @prioritized(Priority.WRITE)
     async def async_set_vpn(self, enabled: bool) -> bool:
+        # VPN and ZeroTier share the generic VPN form (and restart the
+        # firewall): never submit them at the same time. Wi-Fi goes on.
+        async with self._form_lock("vpn"):
+            return await self._submit_vpn(enabled)
+
+    async def _submit_vpn(self, enabled: bool) -> bool:
         """Abilita/disabilita il toggle VPN WireGuard preservando gli altri campi."""
         ts = int(time.time() * 1000)
         get_url = f"{self.base_url}/cgi-bin/luci/admin/network/vpn/config?nomodal=&_={ts}"
@@ -847,9 +1409,10 @@ class CudyClient:
             return False
 
         if token_val:
-            await self._servicectl_restart("firewall", token_val)
+            return await self._servicectl_restart("firewall", token_val)
         return True
 
+    @prioritized(Priority.INTERACTIVE)
     async def async_get_zerotier_state(self) -> dict[str, bool]:
         """Ritorna lo stato ZeroTier.
 
@@ -890,7 +1453,14 @@ class CudyClient:
             raise RuntimeError("ZeroTier generic enabled field not found")
         return {"zerotier": enabled_val == "1" and proto_val in self._ZEROTIER_PROTO_VALUES}
 
+    @prioritized(Priority.WRITE)
     async def async_set_zerotier(self, enabled: bool) -> bool:
+        # VPN and ZeroTier share the generic VPN form (and restart the
+        # firewall): never submit them at the same time. Wi-Fi goes on.
+        async with self._form_lock("vpn"):
+            return await self._submit_zerotier(enabled)
+
+    async def _submit_zerotier(self, enabled: bool) -> bool:
         """Abilita/disabilita ZeroTier sia su firmware dedicati sia su quelli P4 VPN-generic."""
         ts = int(time.time() * 1000)
 
@@ -925,7 +1495,7 @@ class CudyClient:
                 if not ok:
                     return False
                 if token_val:
-                    await self._servicectl_restart("zerotier,firewall", token_val)
+                    return await self._servicectl_restart("zerotier,firewall", token_val)
                 return True
         except Exception as e:
             _LOGGER.debug("Dedicated ZeroTier flow unavailable, fallback to generic VPN flow: %s", e)
@@ -965,9 +1535,115 @@ class CudyClient:
             return False
 
         if token_val:
-            await self._servicectl_restart("zerotier,firewall", token_val)
+            return await self._servicectl_restart("zerotier,firewall", token_val)
         return True
 
+    # ------------------------------------------------------------------
+    # Control-plane snapshot (all switches at once)
+    # ------------------------------------------------------------------
+    @prioritized(Priority.INTERACTIVE)
+    async def async_get_control_state(self) -> dict[str, bool]:
+        """State of every switch from a single pass over the control pages.
+
+        Returns the keys of async_get_wifi_state / async_get_vpn_state /
+        async_get_zerotier_state ("2g", "5g", "wireguard", "zerotier"); a key
+        is missing when its page could not be read. Each page is fetched and
+        parsed once, whatever the number of switches asking.
+        """
+        return await self.scheduler.coalesce(("control",), self._read_control_state)
+
+    async def _read_control_state(self) -> dict[str, bool]:
+        ts = int(time.time() * 1000)
+        setup = f"{self.base_url}/cgi-bin/luci/admin/setup"
+        state: dict[str, bool] = {}
+
+        wifi = await self._control_form(
+            "wifi",
+            [f"{self.base_url}/cgi-bin/luci/admin/network/wireless/config/uncombine?embedded=&nomodal=&_={ts}"],
+            referer=setup,
+        )
+        if wifi is not None:
+            soup = wifi[0]
+            values = {}
+            for band, name in (("2g", "cbid.wireless.wlan00.disabled"), ("5g", "cbid.wireless.wlan10.disabled")):
+                inp = soup.find("input", {"name": name})
+                values[band] = str(inp["value"]) if inp and inp.has_attr("value") else None
+            # same rule as async_get_wifi_state: both fields or nothing
+            if None not in values.values():
+                state.update({band: value == "0" for band, value in values.items()})
+
+        # Same precedence as async_get_vpn_state / async_get_zerotier_state:
+        # the dedicated ZeroTier page wins, the generic VPN page fills the rest.
+        zt_enabled = None
+        dedicated = await self._control_form(
+            "zerotier",
+            [
+                f"{self.base_url}/cgi-bin/luci/admin/network/vpn/zerotier?embedded=&mvpn=&_={ts}",
+                f"{self.base_url}/cgi-bin/luci/admin/network/vpn/zerotier?_={ts}",
+                f"{self.base_url}/cgi-bin/luci/admin/network/vpn/zerotiers?embedded=&mvpn=&_={ts}",
+                f"{self.base_url}/cgi-bin/luci/admin/network/vpn/zerotiers?_={ts}",
+            ],
+            referer=f"{self.base_url}/cgi-bin/luci/admin/network/vpn/zerotier",
+        )
+        if dedicated is not None:
+            zt_enabled = self._form_value(dedicated[1], self._ZEROTIER_DEDICATED_ENABLED)
+        if zt_enabled is not None:
+            state["zerotier"] = zt_enabled == "1"
+            if zt_enabled == "1":
+                state["wireguard"] = False
+
+        if "wireguard" not in state or "zerotier" not in state:
+            generic = await self._control_form(
+                "vpn",
+                [
+                    f"{self.base_url}/cgi-bin/luci/admin/network/vpn/config?nomodal=&_={ts}",
+                    f"{self.base_url}/cgi-bin/luci/admin/network/vpn?_={ts}",
+                ],
+                referer=f"{self.base_url}/cgi-bin/luci/admin/network/vpn",
+            )
+            if generic is not None:
+                form = generic[1]
+                enabled_val = self._form_value(form, self._VPN_GENERIC_ENABLED)
+                proto_val = (self._form_value(form, self._VPN_GENERIC_PROTO) or "").strip().lower()
+                enabled = (enabled_val or "").strip() == "1"
+                state.setdefault("wireguard", enabled and proto_val in self._WIREGUARD_PROTO_VALUES)
+                if enabled_val is not None:
+                    state.setdefault("zerotier", enabled and proto_val in self._ZEROTIER_PROTO_VALUES)
+
+        return state
+
+    async def _control_form(self, page: str, urls: list[str], *, referer: str) -> tuple[BeautifulSoup, Any] | None:
+        """Soup and CBI form of a control page, None if it can't be read.
+
+        Goes straight to the candidate URL that answered last time and backs
+        off from a page none of the candidates serves.
+        """
+        known = self._control_pages.get(page)
+        if known is None and not self._control_absent.should_fetch(page):
+            return None
+        if known is not None:
+            sep = "&" if "?" in known else "?"
+            urls = [f"{self.base_url}{known}{sep}_={int(time.time() * 1000)}"]
+        try:
+            _, soup, form, url = await self._fetch_luci_form(urls, referer=referer)
+        except RuntimeError as err:
+            if (
+                isinstance(err, AuthenticationFailed)
+                or err.__cause__ is None
+                or isinstance(err.__cause__, _TRANSPORT_ERRORS)
+            ):
+                # not logged in or router unreachable: says nothing about the page
+                return None
+            # moved (firmware update?) or missing: every candidate next time
+            self._control_pages.pop(page, None)
+            self._control_absent.record_miss(page)
+            _LOGGER.debug("Control page %s unavailable: %s", page, err)
+            return None
+        self._control_absent.record_hit(page)
+        parts = urlsplit(self._strip_cache_buster(url))
+        self._control_pages[page] = f"{parts.path}?{parts.query}" if parts.query else parts.path
+        return soup, form
+
     # ------------------------------------------------------------------
     # Helper for tests / convenience
     # ------------------------------------------------------------------
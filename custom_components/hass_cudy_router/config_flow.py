@@ -17,7 +17,26 @@ from homeassistant.core import HomeAssistant
 from homeassistant.data_entry_flow import FlowResult
 
 from .client import CudyClient
-from .const import DOMAIN, MODULE_DEVICE_LIST
+from .const import (
+    CONF_CONTROL_SCAN_INTERVAL,
+    CONF_DIAGNOSTIC_SENSORS,
+    CONF_MAX_BODY_SIZE,
+    CONF_MAX_CONCURRENCY,
+    CONF_MEDIUM_SCAN_INTERVAL,
+    CONF_SLOW_SCAN_INTERVAL,
+    DATA_PENDING_SESSIONS,
+    DEFAULT_CONTROL_SCAN_INTERVAL,
+    DEFAULT_DIAGNOSTIC_SENSORS,
+    DEFAULT_MAX_BODY_SIZE,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MEDIUM_SCAN_INTERVAL,
+    DEFAULT_SLOW_SCAN_INTERVAL,
+    DOMAIN,
+    MAX_MAX_CONCURRENCY,
+    MIN_MAX_BODY_SIZE,
+    MIN_SCAN_INTERVAL,
+    MODULE_DEVICE_LIST,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -48,19 +67,25 @@ async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str,
     password = data[CONF_PASSWORD]
 
     try:
+        # a short-lived private session: in HA's shared one the sysauth
+        # cookie would land in the common jar and go out with every other
+        # integration's requests to this host
         client = CudyClient(
             host=host,
             username=username,
             password=password,
             use_https=use_https,
+            connection_limit=1,
         )
     except Exception as err:  # very defensive
         _LOGGER.debug("Error constructing CudyClient for %s: %s", host, err)
         raise CannotConnect from err
 
     ok = False
+    session: dict[str, Any] | None = None
     try:
         ok = await client.authenticate()
+        session = client.export_session()
     except Exception as err:
         _LOGGER.debug("Error while validating connection to %s: %s", host, err)
         raise CannotConnect from err
@@ -73,7 +98,7 @@ async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str,
     if not ok:
         raise InvalidAuth
 
-    return {"title": f"Cudy Router ({host})"}
+    return {"title": f"Cudy Router ({host})", "session": session}
 
 
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -98,6 +123,10 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 await self.async_set_unique_id(user_input[CONF_HOST])
                 self._abort_if_unique_id_configured()
 
+                # hand the fresh session to the entry setup: no second login
+                if info.get("session"):
+                    self.hass.data.setdefault(DATA_PENDING_SESSIONS, {})[user_input[CONF_HOST]] = info["session"]
+
                 return self.async_create_entry(
                     title=info["title"],
                     data=user_input,
@@ -133,7 +162,43 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                     vol.Optional(
                         CONF_SCAN_INTERVAL,
                         default=self._config_entry.options.get(CONF_SCAN_INTERVAL, 30),
-                    ): int,
+                    ): vol.All(vol.Coerce(int), vol.Range(min=MIN_SCAN_INTERVAL)),
+                    vol.Optional(
+                        CONF_MEDIUM_SCAN_INTERVAL,
+                        default=self._config_entry.options.get(
+                            CONF_MEDIUM_SCAN_INTERVAL, DEFAULT_MEDIUM_SCAN_INTERVAL
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=MIN_SCAN_INTERVAL)),
+                    vol.Optional(
+                        CONF_SLOW_SCAN_INTERVAL,
+                        default=self._config_entry.options.get(
+                            CONF_SLOW_SCAN_INTERVAL, DEFAULT_SLOW_SCAN_INTERVAL
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=MIN_SCAN_INTERVAL)),
+                    vol.Optional(
+                        CONF_CONTROL_SCAN_INTERVAL,
+                        default=self._config_entry.options.get(
+                            CONF_CONTROL_SCAN_INTERVAL, DEFAULT_CONTROL_SCAN_INTERVAL
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=MIN_SCAN_INTERVAL)),
+                    vol.Optional(
+                        CONF_MAX_CONCURRENCY,
+                        default=self._config_entry.options.get(
+                            CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_MAX_CONCURRENCY)),
+                    vol.Optional(
+                        CONF_MAX_BODY_SIZE,
+                        default=self._config_entry.options.get(
+                            CONF_MAX_BODY_SIZE, DEFAULT_MAX_BODY_SIZE
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=MIN_MAX_BODY_SIZE)),
+                    vol.Optional(
+                        CONF_DIAGNOSTIC_SENSORS,
+                        default=self._config_entry.options.get(
+                            CONF_DIAGNOSTIC_SENSORS, DEFAULT_DIAGNOSTIC_SENSORS
+                        ),
+                    ): bool,
                     vol.Optional(
                         MODULE_DEVICE_LIST,
                         default=self._config_entry.options.get(MODULE_DEVICE_LIST, ""),
@@ -7,6 +7,86 @@ PLATFORMS = {"sensor", "button", "device_tracker", "switch"}
 
 DEFAULT_SCAN_INTERVAL = 30
 
+# Poll tiers: each tier has its own coordinator and interval.
+# The fast tier uses CONF_SCAN_INTERVAL / DEFAULT_SCAN_INTERVAL.
+TIER_FAST = "fast"
+TIER_MEDIUM = "medium"
+TIER_SLOW = "slow"
+CONF_MEDIUM_SCAN_INTERVAL = "medium_scan_interval"
+CONF_SLOW_SCAN_INTERVAL = "slow_scan_interval"
+DEFAULT_MEDIUM_SCAN_INTERVAL = 120
+DEFAULT_SLOW_SCAN_INTERVAL = 900
+# Shortest interval (seconds) accepted for any poll
+MIN_SCAN_INTERVAL = 10
+# Switch states (Wi-Fi, VPN, ZeroTier) are polled on their own interval
+CONF_CONTROL_SCAN_INTERVAL = "control_scan_interval"
+DEFAULT_CONTROL_SCAN_INTERVAL = 60
+# Seconds a switch change may take (form POST + service restart) before it
+# is reported as failed and the switch reverted
+SWITCH_APPLY_TIMEOUT = 90
+# Seconds before reading the state back once more when the read right after
+# applying a change failed
+SWITCH_CONFIRM_RETRY = 5
+
+# Maximum number of requests kept in flight against a single router.
+# Cudy firmwares run a single-threaded uhttpd, so keep this low.
+CONF_MAX_CONCURRENCY = "max_concurrency"
+DEFAULT_MAX_CONCURRENCY = 2
+# highest value accepted in the options
+MAX_MAX_CONCURRENCY = 8
+
+# Wall-clock budget (seconds) of one poll cycle, whatever the number of
+# modules/URLs: a router that stops answering cannot hold a poll open.
+DEFAULT_POLL_BUDGET = 25
+
+# Largest response body (KiB) read from the router; anything bigger is
+# dropped instead of being buffered.
+CONF_MAX_BODY_SIZE = "max_body_size"
+DEFAULT_MAX_BODY_SIZE = 2048
+MIN_MAX_BODY_SIZE = 64
+
+# Optional diagnostic sensors fed by the request metrics
+CONF_DIAGNOSTIC_SENSORS = "diagnostic_sensors"
+DEFAULT_DIAGNOSTIC_SENSORS = False
+SENSOR_POLL_DURATION = "poll_duration"
+SENSOR_REQUEST_LATENCY_P95 = "request_latency_p95"
+SENSOR_REQUEST_ERROR_RATE = "request_error_rate"
+
+# Negative capability cache: a module empty this many polls in a row is
+# considered absent and only re-probed on the back-off schedule (seconds).
+NEGATIVE_CACHE_THRESHOLD = 3
+NEGATIVE_CACHE_BACKOFF = (5 * 60, 30 * 60, 6 * 60 * 60)
+
+# Circuit breaker: after this many consecutive transport failures (no answer
+# at all) polls stop sweeping the router and a single heartbeat request probes
+# it on the back-off schedule (seconds) until it answers again.
+BREAKER_THRESHOLD = 3
+BREAKER_BACKOFF = (10, 30, 60, 120, 300)
+HEARTBEAT_TIMEOUT = 5
+
+# Request scheduler shared by everything talking to one router: token bucket
+# of REQUEST_BURST requests refilled at REQUEST_RATE per second, and a window
+# (seconds) in which identical reads share one answer.
+REQUEST_RATE = 4.0
+REQUEST_BURST = 4
+COALESCE_WINDOW = 2.0
+# Changes to the same router form made within this window (seconds) are
+# submitted together, with a single service restart
+WRITE_BATCH_WINDOW = 0.5
+# servicectl status polling while the router applies a change: the first
+# check comes after SERVICECTL_POLL_MIN s, each wait is half again as long
+# as the previous one, up to SERVICECTL_POLL_MAX
+SERVICECTL_POLL_MIN = 0.25
+SERVICECTL_POLL_MAX = 2.0
+
+SERVICE_REDISCOVER_CAPABILITIES = "rediscover_capabilities"
+ATTR_ENTRY_ID = "entry_id"
+# Fired while a change is applied on the router (service restart)
+EVENT_APPLY = f"{DOMAIN}_apply"
+
+# hass.data key: sessions opened by the config flow, handed to the new entry
+DATA_PENDING_SESSIONS = f"{DOMAIN}_pending_sessions"
+
 MODULE_SYSTEM = "system"
 MODULE_LAN = "lan"
 MODULE_DEVICES = "devices"
@@ -974,3 +1054,32 @@ CAPABILITY_URLS = {
         "/admin/network/devices/devlist?detail=1",
     ],
 }
+
+# Which coordinator polls which module: fast-changing data (clients, signal)
+# every scan interval, link state and system status less often, static
+# config rarely.
+MODULE_TIERS = {
+    TIER_FAST: [
+        MODULE_DEVICES,
+        MODULE_DEVICE_LIST,
+        MODULE_GSM,
+        MODULE_SMS,
+    ],
+    TIER_MEDIUM: [
+        # uptime and local time keep moving: not with the static config
+        MODULE_SYSTEM,
+        MODULE_WAN,
+        MODULE_WAN_SECONDARY,
+        MODULE_MULTI_WAN,
+        MODULE_MESH,
+        MODULE_VPN,
+        MODULE_USB,
+    ],
+    TIER_SLOW: [
+        MODULE_LAN,
+        MODULE_DHCP,
+        MODULE_WIRELESS_24G,
+        MODULE_WIRELESS_5G,
+        MODULE_WIRELESS_6G,
+    ],
+}
@@ -1,15 +1,24 @@
 from __future__ import annotations
 
 import logging
+import time
 from datetime import timedelta
-from typing import Any
+from typing import Any, Collection
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_SCAN_INTERVAL
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 
-from .const import DEFAULT_SCAN_INTERVAL
+from .breaker import CircuitBreaker
+from .const import (
+    CONF_CONTROL_SCAN_INTERVAL,
+    DEFAULT_CONTROL_SCAN_INTERVAL,
+    DEFAULT_POLL_BUDGET,
+    DEFAULT_SCAN_INTERVAL,
+    MIN_SCAN_INTERVAL,
+)
+from .metrics import RequestMetrics
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -43,27 +52,63 @@ class CudyCoordinator(DataUpdateCoordinator[dict[str, Any]]):
         entry: ConfigEntry,
         api: Any,
         host: str | None = None,
+        *,
+        tier: str | None = None,
+        modules: Collection[str] | None = None,
+        scan_interval: int | None = None,
     ) -> None:
-        options = getattr(entry, "options", None) or {}
-        scan_seconds = int(options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL))
+        if scan_interval is None:
+            options = getattr(entry, "options", None) or {}
+            scan_interval = int(options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL))
+
+        name = f"Cudy Router ({host or entry.data.get('host', 'unknown')})"
+        if tier:
+            name = f"{name} {tier}"
 
         super().__init__(
             hass,
             _LOGGER,
-            name=f"Cudy Router ({host or entry.data.get('host', 'unknown')})",
-            update_interval=timedelta(seconds=scan_seconds),
+            name=name,
+            update_interval=timedelta(seconds=scan_interval),
             config_entry=entry,
         )
 
         self.api = api
+        self.tier = tier
+        # a poll never runs longer than the interval it is scheduled on
+        self.poll_budget = float(min(DEFAULT_POLL_BUDGET, scan_interval))
+        # None = every module (single coordinator setup)
+        self.modules: tuple[str, ...] | None = tuple(modules) if modules is not None else None
         self.data: dict[str, Any] = {}
 
     async def _async_update_data(self) -> dict[str, Any]:
         if not self.api:
             raise UpdateFailed("No API client set on coordinator")
 
+        start = time.monotonic()
+        success = False
+        try:
+            result = await self._async_fetch()
+            success = True
+            return result
+        finally:
+            metrics = getattr(self.api, "metrics", None)
+            if isinstance(metrics, RequestMetrics):
+                metrics.record_poll(self.tier or "default", time.monotonic() - start, success)
+
+    async def _async_fetch(self) -> dict[str, Any]:
+        breaker = getattr(self.api, "breaker", None)
+        if isinstance(breaker, CircuitBreaker) and breaker.is_open:
+            # Router down: no sweep, only a heartbeat when one is due. The
+            # poll that gets an answer goes on with the full sweep.
+            if not breaker.claim_probe() or not await self.api.async_probe():
+                raise UpdateFailed(f"Router unreachable, next probe in {breaker.retry_in:.0f} s")
+
         try:
-            result = await self.api.get_data()
+            if self.modules is None:
+                result = await self.api.get_data()
+            else:
+                result = await self.api.get_data(modules=self.modules, budget=self.poll_budget)
             if result is None:
                 result = {}
             if not isinstance(result, dict):
@@ -75,4 +120,88 @@ class CudyCoordinator(DataUpdateCoordinator[dict[str, Any]]):
             raise
         except Exception as err:
             _LOGGER.debug("Error updating Cudy data: %s", err, exc_info=True)
-            raise UpdateFailed(err) from err
\ No newline at end of file
+            raise UpdateFailed(err) from err
+
+
+class CudyControlCoordinator(DataUpdateCoordinator[dict[str, bool]]):
+    """Switch states of one router, polled together on their own interval.
+
+    Data holds the keys of the client's state getters: "2g", "5g",
+    "wireguard", "zerotier"; a key is missing when it could not be read.
+    """
+
+    _STATE_GETTERS = ("async_get_wifi_state", "async_get_vpn_state", "async_get_zerotier_state")
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        client: Any,
+        host: str | None = None,
+        *,
+        scan_interval: int | None = None,
+    ) -> None:
+        if scan_interval is None:
+            options = getattr(entry, "options", None) or {}
+            scan_interval = max(
+                MIN_SCAN_INTERVAL, int(options.get(CONF_CONTROL_SCAN_INTERVAL, DEFAULT_CONTROL_SCAN_INTERVAL))
+            )
+
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"Cudy Router ({host or entry.data.get('host', 'unknown')}) control",
+            update_interval=timedelta(seconds=scan_interval),
+            config_entry=entry,
+        )
+        self.client = client
+        self.tier = "control"
+        self.data: dict[str, bool] = {}
+
+    async def _async_update_data(self) -> dict[str, bool]:
+        breaker = getattr(self.client, "breaker", None)
+        if isinstance(breaker, CircuitBreaker) and breaker.is_open:
+            # the tier coordinators send the heartbeat; nothing to read until then
+            raise UpdateFailed(f"Router unreachable, next probe in {breaker.retry_in:.0f} s")
+
+        fn = getattr(self.client, "async_get_control_state", None)
+        if callable(fn):
+            try:
+                state = await fn()
+            except Exception as err:
+                raise UpdateFailed(err) from err
+        else:
+            # clients without the snapshot: one getter per kind of switch
+            state = {}
+            for name in self._STATE_GETTERS:
+                getter = getattr(self.client, name, None)
+                if not callable(getter):
+                    continue
+                try:
+                    part = await getter()
+                except Exception as err:
+                    _LOGGER.debug("%s failed: %s", name, err)
+                    continue
+                if isinstance(part, dict):
+                    state.update(part)
+
+        if not state:
+            raise UpdateFailed("No switch state could be read from the router")
+        return dict(state)
+
+
+def coordinator_for_module(entry_data: dict[str, Any], module: str) -> Any:
+    """Return the coordinator polling `module` for a config entry's hass.data."""
+    for coordinator in (entry_data.get("coordinators") or {}).values():
+        modules = getattr(coordinator, "modules", None)
+        if modules is not None and module in modules:
+            return coordinator
+    return entry_data.get("coordinator")
+
+
+def iter_coordinators(entry_data: dict[str, Any]) -> list[Any]:
+    """All coordinators of a config entry (tiers, or the single legacy one)."""
+    coordinators = list((entry_data.get("coordinators") or {}).values())
+    if not coordinators and entry_data.get("coordinator") is not None:
+        coordinators = [entry_data["coordinator"]]
+    return coordinators
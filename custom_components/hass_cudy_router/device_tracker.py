@@ -9,7 +9,7 @@ from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import *
-from .coordinator import CudyCoordinator
+from .coordinator import CudyCoordinator, coordinator_for_module
 
 
 def _device_unique_id(entry_id: str, mac: str) -> str:
@@ -23,7 +23,7 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     data = hass.data[DOMAIN][entry.entry_id]
-    coordinator: CudyCoordinator = data["coordinator"]
+    coordinator: CudyCoordinator = coordinator_for_module(data, MODULE_DEVICES)
     spec = data.get("spec")
     if spec and "device_tracker" not in getattr(spec, "platforms", set()):
         return
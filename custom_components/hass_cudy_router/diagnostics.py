@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST, CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .coordinator import iter_coordinators
+
+TO_REDACT = {CONF_HOST, CONF_PASSWORD, CONF_USERNAME, "host"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    data: dict[str, Any] = hass.data.get(DOMAIN, {}).get(entry.entry_id) or {}
+    integration = data.get("integration")
+    api = getattr(integration, "api", None)
+
+    diag: dict[str, Any] = {
+        "entry": async_redact_data(dict(entry.data), TO_REDACT),
+        "options": dict(entry.options),
+        "model": getattr(integration, "model", None),
+        "coordinators": {
+            getattr(c, "tier", None) or "default": {
+                "modules": list(getattr(c, "modules", None) or ()),
+                "update_interval": c.update_interval.total_seconds() if c.update_interval else None,
+                "last_update_success": c.last_update_success,
+            }
+            for c in iter_coordinators(data)
+        },
+    }
+
+    control = data.get("control_coordinator")
+    if control is not None:
+        diag["coordinators"]["control"] = {
+            "update_interval": control.update_interval.total_seconds() if control.update_interval else None,
+            "last_update_success": control.last_update_success,
+            "state": dict(control.data or {}),
+        }
+
+    client = data.get("client")
+    if client is not None:
+        diag["client"] = {
+            "authenticated": client.is_authenticated,
+            "auth_generation": client.auth_generation,
+            "login_page_reauths": client.login_page_reauths,
+        }
+        breaker = getattr(client, "breaker", None)
+        if breaker is not None:
+            diag["client"]["breaker"] = breaker.as_dict()
+        scheduler = getattr(client, "scheduler", None)
+        if scheduler is not None:
+            diag["client"]["scheduler"] = scheduler.as_dict()
+        applies = getattr(client, "applies", None)
+        if applies:
+            diag["client"]["last_applies"] = dict(applies)
+        metrics = getattr(client, "metrics", None)
+        if metrics is not None:
+            diag["metrics"] = metrics.summary()
+
+    if api is not None:
+        diag["parse_cache"] = api.parse_cache.as_dict()
+        diag["url_cache"] = async_redact_data(api.url_cache.as_dict(), TO_REDACT)
+        diag["absent_modules"] = api.capabilities.as_dict()
+
+    return diag
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import bisect
+import math
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+from urllib.parse import urlsplit
+
+DEFAULT_REQUEST_SAMPLES = 512
+DEFAULT_POLL_SAMPLES = 64
+DEFAULT_APPLY_SAMPLES = 64
+# upper bounds (seconds) of the apply duration histogram buckets
+APPLY_BUCKETS = (1.0, 2.0, 5.0, 10.0, 20.0, 35.0)
+
+_NUMERIC_SEGMENT_RE = re.compile(r"/\d+(?=/|$)")
+
+
+def url_template(url: str) -> str:
+    """Endpoint a request is grouped under: path only, numeric ids folded."""
+    path = urlsplit(url).path or "/"
+    return _NUMERIC_SEGMENT_RE.sub("/{n}", path)
+
+
+def percentile(values: Iterable[float], pct: float) -> float | None:
+    """Nearest-rank percentile, None for no values."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _ms(seconds: float | None) -> float | None:
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+@dataclass(frozen=True, slots=True)
+class RequestSample:
+    endpoint: str
+    method: str
+    # None: no response at all (connection error, timeout)
+    status: int | None
+    size: int | None
+    ttfb: float | None
+    latency: float
+    retries: int
+    at: float
+
+    @property
+    def error(self) -> bool:
+        return self.status is None or self.status >= 400
+
+
+@dataclass(frozen=True, slots=True)
+class PollSample:
+    tier: str
+    duration: float
+    success: bool
+    at: float
+
+
+@dataclass(frozen=True, slots=True)
+class ApplySample:
+    # service group restarted, e.g. "wireless,vlan"
+    services: str
+    duration: float
+    success: bool
+    at: float
+
+
+def _bucket_label(bound: float | None) -> str:
+    return f"le_{bound:g}s" if bound is not None else "inf"
+
+
+class RequestMetrics:
+    """Bounded in-memory record of the requests and polls of one router.
+
+    Only the most recent samples are kept (ring buffers), summaries are
+    computed on demand for diagnostics and the diagnostic sensors.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_requests: int = DEFAULT_REQUEST_SAMPLES,
+        max_polls: int = DEFAULT_POLL_SAMPLES,
+        max_applies: int = DEFAULT_APPLY_SAMPLES,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._requests: deque[RequestSample] = deque(maxlen=max_requests)
+        self._polls: deque[PollSample] = deque(maxlen=max_polls)
+        self._applies: deque[ApplySample] = deque(maxlen=max_applies)
+        # service group -> count per APPLY_BUCKETS bucket (+ one overflow),
+        # since start: unlike the samples these are never dropped
+        self._apply_histograms: dict[str, list[int]] = {}
+        self._clock = clock
+
+    def record_request(
+        self,
+        method: str,
+        url: str,
+        *,
+        status: int | None,
+        size: int | None,
+        ttfb: float | None,
+        latency: float,
+        retries: int = 0,
+    ) -> None:
+        self._requests.append(
+            RequestSample(
+                endpoint=url_template(url),
+                method=method.upper(),
+                status=status,
+                size=size,
+                ttfb=ttfb,
+                latency=latency,
+                retries=retries,
+                at=self._clock(),
+            )
+        )
+
+    def record_poll(self, tier: str, duration: float, success: bool) -> None:
+        self._polls.append(PollSample(tier, duration, success, self._clock()))
+
+    def record_apply(self, services: str, duration: float, success: bool) -> None:
+        self._applies.append(ApplySample(services, duration, success, self._clock()))
+        buckets = self._apply_histograms.setdefault(services, [0] * (len(APPLY_BUCKETS) + 1))
+        buckets[bisect.bisect_left(APPLY_BUCKETS, duration)] += 1
+
+    def apply_percentile(self, services: str, pct: float) -> float | None:
+        """Percentile of the successful apply durations of a service group."""
+        return percentile((a.duration for a in self._applies if a.services == services and a.success), pct)
+
+    @property
+    def last_poll(self) -> PollSample | None:
+        return self._polls[-1] if self._polls else None
+
+    def latency_percentile(self, pct: float) -> float | None:
+        return percentile((s.latency for s in self._requests), pct)
+
+    def error_rate(self) -> float | None:
+        if not self._requests:
+            return None
+        return sum(1 for s in self._requests if s.error) / len(self._requests)
+
+    def summary(self) -> dict[str, Any]:
+        endpoints: dict[str, list[RequestSample]] = {}
+        for sample in self._requests:
+            endpoints.setdefault(f"{sample.method} {sample.endpoint}", []).append(sample)
+
+        tiers: dict[str, list[PollSample]] = {}
+        for poll in self._polls:
+            tiers.setdefault(poll.tier, []).append(poll)
+
+        applies: dict[str, list[ApplySample]] = {}
+        for apply in self._applies:
+            applies.setdefault(apply.services, []).append(apply)
+
+        error_rate = self.error_rate()
+        return {
+            "requests": len(self._requests),
+            "latency_p95_ms": _ms(self.latency_percentile(95)),
+            "error_rate": round(error_rate, 3) if error_rate is not None else None,
+            "endpoints": {
+                name: {
+                    "count": len(samples),
+                    "errors": sum(1 for s in samples if s.error),
+                    "retries": sum(s.retries for s in samples),
+                    "last_status": samples[-1].status,
+                    "latency_p50_ms": _ms(percentile((s.latency for s in samples), 50)),
+                    "latency_p95_ms": _ms(percentile((s.latency for s in samples), 95)),
+                    "ttfb_p95_ms": _ms(
+                        percentile((s.ttfb for s in samples if s.ttfb is not None), 95)
+                    ),
+                    "bytes_max": max((s.size for s in samples if s.size is not None), default=None),
+                }
+                for name, samples in sorted(endpoints.items())
+            },
+            "polls": {
+                tier: {
+                    "count": len(polls),
+                    "failures": sum(1 for p in polls if not p.success),
+                    "last_s": round(polls[-1].duration, 3),
+                    "p95_s": round(percentile((p.duration for p in polls), 95) or 0.0, 3),
+                }
+                for tier, polls in sorted(tiers.items())
+            },
+            "applies": {
+                services: {
+                    "count": len(samples),
+                    "failures": sum(1 for a in samples if not a.success),
+                    "last_s": round(samples[-1].duration, 3),
+                    "p50_s": round(percentile((a.duration for a in samples), 50) or 0.0, 3),
+                    "p95_s": round(percentile((a.duration for a in samples), 95) or 0.0, 3),
+                    "histogram": {
+                        _bucket_label(bound): count
+                        for bound, count in zip((*APPLY_BUCKETS, None), self._apply_histograms[services])
+                    },
+                }
+                for services, samples in sorted(applies.items())
+            },
+        }
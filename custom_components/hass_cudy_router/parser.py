@@ -1,7 +1,9 @@
 # custom_components/hass_cudy_router/parsers.py
 from __future__ import annotations
 
-from typing import Any, Optional
+from functools import lru_cache
+from html.parser import HTMLParser
+from typing import Any, Callable, NamedTuple, Optional, Union
 import re
 
 from bs4 import BeautifulSoup
@@ -16,8 +18,39 @@ from custom_components.hass_cudy_router.const import (
     MODULE_DEVICE_LIST,
 )
 
+# A page is either raw HTML or an already built soup: parse_html builds the
+# soup once and every extractor below reuses it.
+Document = Union[str, BeautifulSoup]
+
+# ---- Backend ---------------------------------------------------------------
+
+def _detect_backend() -> str:
+    # lxml builds the tree ~10x faster than the pure Python html.parser and
+    # yields the same results on LuCI pages; it is optional.
+    try:
+        import lxml  # noqa: F401
+    except ImportError:
+        return "html.parser"
+    return "lxml"
+
+
+HTML_BACKEND = _detect_backend()
+
+
+def make_soup(html: str, backend: str | None = None) -> BeautifulSoup:
+    """Build a soup with the fastest available tree builder."""
+    return BeautifulSoup(html, backend or HTML_BACKEND)
+
 # ---- Helpers ---------------------------------------------------------------
 
+def _soup(doc: Document | None) -> BeautifulSoup | None:
+    if isinstance(doc, BeautifulSoup):
+        return doc
+    if not doc:
+        return None
+    return make_soup(doc)
+
+
 def _clean(s: str | None) -> str:
     return " ".join((s or "").split()).strip()
 
@@ -35,18 +68,205 @@ def _to_int_if_possible(value: str | None) -> Optional[int]:
         return int(m.group(1)) if m else None
 
 
-def extract_kv_pairs(html: str) -> dict[str, str]:
+def _add_row_pair(out: dict[str, str], seen: dict[str, int], k: str, v: str) -> None:
+    if not k:
+        return
+    # Some pages repeat the same label multiple times (e.g. SCC)
+    if k in out:
+        seen[k] = seen.get(k, 1) + 1
+        out[f"{k} ({seen[k]})"] = v
+    else:
+        out[k] = v
+        seen[k] = 1
+
+
+# ---- Streaming label/value scanner -----------------------------------------
+
+# Elements html.parser never expects a closing tag for
+_VOID_TAGS = frozenset(
+    "area base br col embed hr img input link meta param source track wbr "
+    "basefont bgsound command frame image isindex keygen menuitem nextid spacer".split()
+)
+# Text that BeautifulSoup's get_text() leaves out
+_SKIP_TEXT_TAGS = frozenset(("script", "style", "template"))
+_STRUCTURE_TAGS = frozenset(("table", "tr", "td", "th", "p", "dl", "dt", "dd"))
+
+
+class _Irregular(Exception):
+    """The page does not have the simple shape the scanner understands."""
+
+
+class _KvScanner(HTMLParser):
+    """Event driven twin of the DOM walk in extract_kv_pairs.
+
+    Collects rows of a table and dt/dd of a dl while tokenizing, without
+    building a tree. Anything whose DOM would not map 1:1 on the simple
+    shapes (nested tables/lists, unclosed cells, mis-nested structure
+    tags) raises _Irregular and the caller falls back to the DOM walk.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self._stack: list[str] = []
+        self._skip = 0
+        self._in_table = False
+        # current row: list of [cell text parts, first <p> text parts or None]
+        self._row: list[list[Any]] | None = None
+        self._cell: list[Any] | None = None
+        # 0: no <p> seen in the cell yet, 1: inside the first one, 2: done
+        self._p_state = 0
+        self._dl: tuple[list[list[str]], list[list[str]]] | None = None
+        self._dl_item: list[str] | None = None
+        self.rows: list[tuple[str, str]] = []
+        self.dl_pairs: list[tuple[str, str]] = []
+
+    # -- tags ---------------------------------------------------------------
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag in _VOID_TAGS:
+            return
+        self._stack.append(tag)
+        if tag in _SKIP_TEXT_TAGS:
+            self._skip += 1
+        elif tag in _STRUCTURE_TAGS:
+            self._open(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in _VOID_TAGS or tag not in self._stack:
+            # stray end tag: the DOM builder ignores it as well
+            return
+        while True:
+            top = self._stack.pop()
+            if top != tag and top in _STRUCTURE_TAGS:
+                # implicitly closed structure: leave it to the DOM builder
+                raise _Irregular(top)
+            if top in _SKIP_TEXT_TAGS:
+                self._skip -= 1
+            if top == tag:
+                break
+        if tag in _STRUCTURE_TAGS:
+            self._close(tag)
+
+    def handle_data(self, data: str) -> None:
+        if self._skip:
+            return
+        if self._cell is not None:
+            self._cell[0].append(data)
+            if self._p_state == 1:
+                self._cell[1].append(data)
+        if self._dl_item is not None:
+            self._dl_item.append(data)
+
+    def close(self) -> None:
+        super().close()
+        if any(tag in _STRUCTURE_TAGS for tag in self._stack):
+            raise _Irregular("unclosed")
+
+    # -- structure ----------------------------------------------------------
+
+    def _open(self, tag: str) -> None:
+        if tag == "table":
+            if self._in_table:
+                raise _Irregular(tag)
+            self._in_table = True
+        elif tag == "tr":
+            if self._row is not None:
+                raise _Irregular(tag)
+            if self._in_table:
+                self._row = []
+        elif tag in ("td", "th"):
+            if self._cell is not None or (self._in_table and self._row is None):
+                raise _Irregular(tag)
+            if self._row is not None:
+                self._cell = [[], None]
+                self._p_state = 0
+        elif tag == "p":
+            if self._cell is not None:
+                if self._p_state == 1:
+                    raise _Irregular(tag)
+                if self._p_state == 0:
+                    self._cell[1] = []
+                    self._p_state = 1
+        elif tag == "dl":
+            if self._dl is not None:
+                raise _Irregular(tag)
+            self._dl = ([], [])
+        elif tag in ("dt", "dd"):
+            if self._dl_item is not None:
+                raise _Irregular(tag)
+            if self._dl is not None:
+                self._dl_item = []
+                self._dl[0 if tag == "dt" else 1].append(self._dl_item)
+
+    def _close(self, tag: str) -> None:
+        if tag == "table":
+            self._in_table = False
+        elif tag == "tr":
+            if self._row is not None:
+                self._end_row(self._row)
+            self._row = None
+        elif tag in ("td", "th"):
+            if self._cell is not None and self._row is not None:
+                self._row.append(self._cell)
+            self._cell = None
+        elif tag == "p":
+            if self._p_state == 1:
+                self._p_state = 2
+        elif tag == "dl":
+            if self._dl is not None:
+                for dt, dd in zip(*self._dl):
+                    self.dl_pairs.append((_clean("".join(dt)), _clean("".join(dd))))
+            self._dl = None
+        elif tag in ("dt", "dd"):
+            self._dl_item = None
+
+    def _end_row(self, cells: list[list[Any]]) -> None:
+        if len(cells) < 2:
+            return
+        label_cell, value_cell = (cells[1], cells[2]) if len(cells) >= 3 else (cells[0], cells[1])
+        k = _clean("".join(label_cell[1] if label_cell[1] is not None else label_cell[0]))
+        v = _clean("".join(value_cell[1] if value_cell[1] is not None else value_cell[0]))
+        self.rows.append((k, v))
+
+
+def scan_kv_pairs(html: str) -> dict[str, str] | None:
+    """
+    Fast path of extract_kv_pairs: same result, computed while tokenizing.
+    Returns None when the page is too irregular to be handled without a DOM.
+    """
+    scanner = _KvScanner()
+    try:
+        scanner.feed(html)
+        scanner.close()
+    except _Irregular:
+        return None
+
+    out: dict[str, str] = {}
+    seen: dict[str, int] = {}
+    for k, v in scanner.rows:
+        _add_row_pair(out, seen, k, v)
+    for k, v in scanner.dl_pairs:
+        if k:
+            out[k] = v
+    return out
+
+
+def extract_kv_pairs(html: Document) -> dict[str, str]:
     """
     Best-effort extraction of "Label" -> "Value" from a LuCI status page.
     Supports table (tr/td or tr/th) and dl/dt/dd.
     """
+    if isinstance(html, str) and html:
+        fast = scan_kv_pairs(html)
+        if fast is not None:
+            return fast
+
     out: dict[str, str] = {}
     seen: dict[str, int] = {}
-    if not html:
+    soup = _soup(html)
+    if soup is None:
         return out
 
-    soup = BeautifulSoup(html, "html.parser")
-
     # Tables
     # LuCI pages come in a few variants:
     # - 2-column (Label | Value)
@@ -70,14 +290,7 @@ def extract_kv_pairs(html: str) -> dict[str, str]:
 
             k = _clean(ps[0].get_text()) if ps else _clean(label_cell.get_text())
             v = _clean(vs[0].get_text()) if vs else _clean(value_cell.get_text())
-            if k:
-                # Some pages repeat the same label multiple times (e.g. SCC)
-                if k in out:
-                    seen[k] = seen.get(k, 1) + 1
-                    out[f"{k} ({seen[k]})"] = v
-                else:
-                    out[k] = v
-                    seen[k] = 1
+            _add_row_pair(out, seen, k, v)
 
     # dl/dt/dd
     for dl in soup.find_all("dl"):
@@ -92,16 +305,16 @@ def extract_kv_pairs(html: str) -> dict[str, str]:
     return out
 
 
-def extract_xhr_endpoints(html: str) -> dict[str, dict[str, str]]:
+def extract_xhr_endpoints(html: Document) -> dict[str, dict[str, str]]:
     """
     Extract endpoints from pages that use cbi_xhr_load.
     Returns: { "/cgi-bin/luci/...": {"args": "nomodal=&iface=4g"} , ... }
     """
     endpoints: dict[str, dict[str, str]] = {}
-    if not html:
+    soup = _soup(html)
+    if soup is None:
         return endpoints
 
-    soup = BeautifulSoup(html, "html.parser")
     scripts = soup.find_all("script")
 
     # Matches: cbi_xhr_load(..., '/cgi-bin/luci/admin/...', 'argstring');
@@ -122,30 +335,56 @@ def extract_xhr_endpoints(html: str) -> dict[str, dict[str, str]]:
     return endpoints
 
 
-def parse_module_by_sensors(module: str, html: str) -> dict[str, Any]:
-    sensors = SENSORS.get(module, [])
-    kv = extract_kv_pairs(html)
+# ---- Sensor label index ----------------------------------------------------
 
-    # case-insensitive lookup
-    kv_lower = {k.lower(): v for k, v in kv.items()}
+def _convert_text(value: str | None) -> Any:
+    return _clean(value) if value else None
 
-    result: dict[str, Any] = {}
-    for spec in sensors:
-        sensor_key = spec[SENSORS_KEY_KEY]
-        labels: list[str] = spec.get(SENSORS_KEY_DESCRIPTION, []) or []
 
-        found: str | None = None
-        for label in labels:
+class _SensorIndex(NamedTuple):
+    # (sensor key, converter) in SENSORS order
+    sensors: tuple[tuple[str, Callable[[str | None], Any]], ...]
+    # lowercased label -> ((sensor key, label priority, exact label), ...)
+    labels: dict[str, tuple[tuple[str, int, str], ...]]
+
+
+@lru_cache(maxsize=None)
+def _sensor_index(module: str) -> _SensorIndex:
+    """Normalized SENSORS labels of a module, built once per module."""
+    sensors: list[tuple[str, Callable[[str | None], Any]]] = []
+    labels: dict[str, list[tuple[str, int, str]]] = {}
+    for spec in SENSORS.get(module, []):
+        sensor_key = spec[SENSORS_KEY_KEY]
+        if spec.get(SENSORS_KEY_CLASS) == SensorStateClass.MEASUREMENT:
+            sensors.append((sensor_key, _to_int_if_possible))
+        else:
+            sensors.append((sensor_key, _convert_text))
+        for prio, label in enumerate(spec.get(SENSORS_KEY_DESCRIPTION, []) or []):
             label = _clean(label)
-            if not label:
-                continue
-            if label in kv:
-                found = kv[label]
-                break
-            low = label.lower()
-            if low in kv_lower:
-                found = kv_lower[low]
-                break
+            if label:
+                labels.setdefault(label.lower(), []).append((sensor_key, prio, label))
+    return _SensorIndex(tuple(sensors), {k: tuple(v) for k, v in labels.items()})
+
+
+def parse_module_by_sensors(module: str, html: Document) -> dict[str, Any]:
+    index = _sensor_index(module)
+    kv = extract_kv_pairs(html)
+
+    # sensor key -> (label priority, exact match, value). The first label of
+    # a spec wins; for one label an exact match beats a case-insensitive
+    # one, among case-insensitive ones the last on the page wins.
+    best: dict[str, tuple[int, bool, str]] = {}
+    for k, v in kv.items():
+        for sensor_key, prio, label in index.labels.get(k.lower(), ()):
+            exact = k == label
+            current = best.get(sensor_key)
+            if current is None or prio < current[0] or (prio == current[0] and not current[1]):
+                best[sensor_key] = (prio, exact, v)
+
+    result: dict[str, Any] = {}
+    for sensor_key, convert in index.sensors:
+        match = best.get(sensor_key)
+        found = match[2] if match else None
 
         # GSM: some firmwares expose a single "Upload / Download" value (e.g. "18.25 GB / 192.26 GB")
         if module == "gsm" and sensor_key in ("gsm_upload", "gsm_download") and found and "/" in found:
@@ -153,18 +392,14 @@ def parse_module_by_sensors(module: str, html: str) -> dict[str, Any]:
             if len(parts) >= 2:
                 found = parts[0] if sensor_key == "gsm_upload" else parts[1]
 
-        state_class = spec.get(SENSORS_KEY_CLASS)
-        if state_class == SensorStateClass.MEASUREMENT:
-            result[sensor_key] = _to_int_if_possible(found)
-        else:
-            result[sensor_key] = _clean(found) if found else None
+        result[sensor_key] = convert(found)
 
     return result
 
 
 # ---- Special: Devices summary (combines both variants) ---------------------
 
-def parse_devices(html: str) -> dict[str, Any]:
+def parse_devices(html: Document) -> dict[str, Any]:
     """
     Combines:
     - label/value rows (Online/Blocked, etc.)
@@ -182,12 +417,12 @@ def parse_devices(html: str) -> dict[str, Any]:
         SENSOR_DEVICE_MESH_COUNT,
     )
 
-    result = parse_module_by_sensors(MODULE_DEVICES, html)
+    soup = _soup(html)
+    result = parse_module_by_sensors(MODULE_DEVICES, soup)
 
-    if not html:
+    if soup is None:
         return result
 
-    soup = BeautifulSoup(html, "html.parser")
     table = soup.select_one("table.table")
     if not table:
         return result
@@ -238,7 +473,7 @@ def parse_devices(html: str) -> dict[str, Any]:
 _UP_RE = re.compile(r"↑\s*([\d.]+)\s*([A-Za-z/]+)")
 _DOWN_RE = re.compile(r"↓\s*([\d.]+)\s*([A-Za-z/]+)")
 
-def parse_device_list(html: str) -> list[dict[str, Any]]:
+def parse_device_list(html: Document) -> list[dict[str, Any]]:
     """
     Parses /admin/network/devices/devlist
     Returns list of dicts keyed by DEVICE_* constants.
@@ -255,10 +490,10 @@ def parse_device_list(html: str) -> list[dict[str, Any]]:
     )
 
     out: list[dict[str, Any]] = []
-    if not html:
+    soup = _soup(html)
+    if soup is None:
         return out
 
-    soup = BeautifulSoup(html, "html.parser")
     table = soup.find("table", class_=re.compile(r"\btable\b"))
     if not table:
         return out
@@ -347,17 +582,25 @@ def parse_html(module: str, html: str) -> Any:
     if not html:
         return [] if module == MODULE_DEVICE_LIST else {}
 
-    # XHR shell detection (important for gsm/sms sometimes)
-    xhr = extract_xhr_endpoints(html)
-    if xhr:
-        # let API fetch each xhr endpoint and parse those fragments separately
-        return {"xhr_endpoints": xhr}
+    # Build the DOM at most once and only where a tree walk is needed, every
+    # extractor below reuses it
+    soup: BeautifulSoup | None = None
+
+    # XHR shell detection (important for gsm/sms sometimes); no point walking
+    # the scripts of a page that never calls cbi_xhr_load
+    if "cbi_xhr_load" in html:
+        soup = make_soup(html)
+        xhr = extract_xhr_endpoints(soup)
+        if xhr:
+            # let API fetch each xhr endpoint and parse those fragments separately
+            return {"xhr_endpoints": xhr}
 
     if module == MODULE_DEVICES:
-        return parse_devices(html)
+        return parse_devices(soup or make_soup(html))
 
     if module == MODULE_DEVICE_LIST:
-        return parse_device_list(html)
+        return parse_device_list(soup or make_soup(html))
 
-    # default driven purely by SENSORS descriptors
-    return parse_module_by_sensors(module, html)
\ No newline at end of file
+    # default driven purely by SENSORS descriptors: label/value pages are
+    # handled by the streaming scanner, no tree needed
+    return parse_module_by_sensors(module, soup or html)
\ No newline at end of file
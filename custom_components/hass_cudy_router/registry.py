@@ -1,17 +1,43 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 
 from homeassistant.core import HomeAssistant
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_SCAN_INTERVAL
 
+from .cache import UrlResolutionCache
 from .client import CudyClient
-from .coordinator import CudyCoordinator
+from .coordinator import CudyControlCoordinator, CudyCoordinator
 from .api import CudyApi
-from .const import CUDY_DEVICES
+from .const import (
+    CONF_MAX_CONCURRENCY,
+    CONF_MEDIUM_SCAN_INTERVAL,
+    CONF_SLOW_SCAN_INTERVAL,
+    CUDY_DEVICES,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MEDIUM_SCAN_INTERVAL,
+    DEFAULT_SCAN_INTERVAL,
+    DEFAULT_SLOW_SCAN_INTERVAL,
+    MIN_SCAN_INTERVAL,
+    MODULE_SYSTEM,
+    MODULE_TIERS,
+    TIER_FAST,
+    TIER_MEDIUM,
+    TIER_SLOW,
+)
+from .storage import CudyStore
 
 _LOGGER = logging.getLogger(__name__)
 
+# option key / default interval (seconds) of each poll tier
+TIER_INTERVALS = {
+    TIER_FAST: (CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL),
+    TIER_MEDIUM: (CONF_MEDIUM_SCAN_INTERVAL, DEFAULT_MEDIUM_SCAN_INTERVAL),
+    TIER_SLOW: (CONF_SLOW_SCAN_INTERVAL, DEFAULT_SLOW_SCAN_INTERVAL),
+}
+
 
 class CudyIntegration:
     """Runtime integration instance.
@@ -26,23 +52,73 @@ class CudyIntegration:
         entry: ConfigEntry,
         client: CudyClient,
         model: str,
+        store: CudyStore | None = None,
     ) -> None:
         self.hass = hass
         self.entry = entry
         self.client = client
         self.model = model
+        self.store = store
 
-        self.api = CudyApi(client)
+        self.url_cache = UrlResolutionCache(
+            entry.data.get("host") or "",
+            on_change=store.async_schedule_save if store else None,
+        )
+        if store is not None:
+            self.url_cache.load(store.data.get("url_cache"))
+            store.register("url_cache", self.url_cache.as_dict)
 
-        self.coordinator = CudyCoordinator(
-            hass=hass,
-            entry=entry,
-            api=self.api,
-            host=entry.data.get("host"),
+        options = getattr(entry, "options", None) or {}
+        self.api = CudyApi(
+            client,
+            max_concurrency=int(options.get(CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY)),
+            url_cache=self.url_cache,
         )
 
+        # One coordinator per poll tier, so slow static pages never hold up
+        # (or get re-scraped with) the fast-changing ones.
+        self.coordinators: dict[str, CudyCoordinator] = {}
+        for tier, modules in MODULE_TIERS.items():
+            conf_key, default = TIER_INTERVALS[tier]
+            self.coordinators[tier] = CudyCoordinator(
+                hass=hass,
+                entry=entry,
+                api=self.api,
+                host=entry.data.get("host"),
+                tier=tier,
+                modules=modules,
+                scan_interval=max(MIN_SCAN_INTERVAL, int(options.get(conf_key, default))),
+            )
+
+        # Primary coordinator: the one carrying system info (model, firmware)
+        self.coordinator = next(
+            c for c in self.coordinators.values() if MODULE_SYSTEM in (c.modules or ())
+        )
+        # Switch states, fetched together for all switch entities
+        self.control_coordinator = CudyControlCoordinator(hass, entry, client, host=entry.data.get("host"))
+        self._setup_done = False
+
     async def async_setup(self) -> None:
-        await self.coordinator.async_config_entry_first_refresh()
+        if self._setup_done:
+            return
+        self._setup_done = True
+        # The fast tier first: it reads the GSM page the WAN values of P4/LTE
+        # firmwares (no WAN page) are derived from, and sensors are only
+        # created for values present after the first refresh.
+        fast = self.coordinators.get(TIER_FAST)
+        if fast is not None:
+            await fast.async_config_entry_first_refresh()
+        await asyncio.gather(
+            *(c.async_config_entry_first_refresh() for c in self.coordinators.values() if c is not fast)
+        )
+        # switches are optional: a router without them must not fail setup
+        await self.control_coordinator.async_refresh()
+
+    async def async_rediscover_capabilities(self) -> None:
+        """Drop learned URLs / absent modules and re-probe the router now."""
+        self.api.reset_capabilities()
+        for coordinator in self.coordinators.values():
+            await coordinator.async_request_refresh()
 
 
 async def create_model_integration(
@@ -50,6 +126,7 @@ async def create_model_integration(
     hass: HomeAssistant,
     entry: ConfigEntry,
     client: CudyClient,
+    store: CudyStore | None = None,
 ) -> CudyIntegration:
     if model not in CUDY_DEVICES:
         _LOGGER.error("Unsupported or unknown Cudy model detected: %s", model)
@@ -60,6 +137,7 @@ async def create_model_integration(
         entry=entry,
         client=client,
         model=model,
+        store=store,
     )
     await integration.async_setup()
     return integration
\ No newline at end of file
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import heapq
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Hashable, Iterator, TypeVar
+
+from .const import COALESCE_WINDOW, REQUEST_BURST, REQUEST_RATE
+
+_T = TypeVar("_T")
+
+
+class Priority(IntEnum):
+    """Request classes, lower is served first."""
+
+    WRITE = 0
+    INTERACTIVE = 1
+    BACKGROUND = 2
+
+
+_PRIORITY: ContextVar[Priority] = ContextVar("cudy_request_priority", default=Priority.BACKGROUND)
+
+
+def current_priority() -> Priority:
+    return _PRIORITY.get()
+
+
+@contextmanager
+def request_priority(priority: Priority) -> Iterator[None]:
+    """Requests sent from within the block are queued with `priority`."""
+    token = _PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(token)
+
+
+def prioritized(priority: Priority) -> Callable[[Callable[..., Awaitable[_T]]], Callable[..., Awaitable[_T]]]:
+    """Decorator form of request_priority for client coroutines."""
+
+    def decorator(fn: Callable[..., Awaitable[_T]]) -> Callable[..., Awaitable[_T]]:
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> _T:
+            with request_priority(priority):
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class RequestScheduler:
+    """Admission control for every request sent to one router.
+
+    Requests take a token from a bucket of `burst` tokens refilled at `rate`
+    per second; when it is empty they queue and are let through by priority,
+    so a switch toggled by the user overtakes the reads of a running poll.
+    Identical reads issued within `window` seconds share one answer; any
+    write drops what was shared so far.
+    """
+
+    def __init__(
+        self,
+        *,
+        rate: float = REQUEST_RATE,
+        burst: int = REQUEST_BURST,
+        window: float = COALESCE_WINDOW,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._rate = max(0.001, float(rate))
+        self._burst = max(1, int(burst))
+        self._window = float(window)
+        self._clock = clock
+        self._tokens = float(self._burst)
+        self._updated = clock()
+        # heap of [priority, seq, future]
+        self._waiters: list[list[Any]] = []
+        self._seq = itertools.count()
+        self._wakeup: asyncio.TimerHandle | None = None
+
+        self._inflight: dict[Hashable, asyncio.Future[Any]] = {}
+        self._recent: dict[Hashable, tuple[float, Any]] = {}
+        self._generation = 0
+
+        self.granted = {p.name.lower(): 0 for p in Priority}
+        self.queued = 0
+        self.coalesced = 0
+        self.max_wait = 0.0
+
+    # ------------------------------------------------------------------
+    # Token bucket
+    # ------------------------------------------------------------------
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(float(self._burst), self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    async def acquire(self, priority: Priority | None = None) -> None:
+        """Wait for a token; `priority` defaults to the caller's context."""
+        if priority is None:
+            priority = current_priority()
+        self._refill()
+        if not self._waiters and self._tokens >= 1:
+            self._tokens -= 1
+            self.granted[priority.name.lower()] += 1
+            return
+
+        loop = asyncio.get_running_loop()
+        fut: asyncio.Future[None] = loop.create_future()
+        heapq.heappush(self._waiters, [priority, next(self._seq), fut])
+        self.queued += 1
+        start = self._clock()
+        self._schedule(loop)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # granted just as we were cancelled: hand the token on
+                self._tokens += 1
+                self._release()
+            raise
+        self.granted[priority.name.lower()] += 1
+        self.max_wait = max(self.max_wait, self._clock() - start)
+
+    def _schedule(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._wakeup is not None or not self._waiters:
+            return
+        delay = max(0.0, (1 - self._tokens) / self._rate)
+        self._wakeup = loop.call_later(delay, self._release)
+
+    def _release(self) -> None:
+        self._wakeup = None
+        self._refill()
+        while self._waiters and self._tokens >= 1:
+            _, _, fut = heapq.heappop(self._waiters)
+            if fut.done():
+                continue
+            self._tokens -= 1
+            fut.set_result(None)
+        # drop cancelled waiters so they don't keep a wakeup scheduled
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+        if self._waiters:
+            self._schedule(asyncio.get_running_loop())
+
+    # ------------------------------------------------------------------
+    # Read coalescing
+    # ------------------------------------------------------------------
+    async def coalesce(self, key: Hashable, factory: Callable[[], Awaitable[_T]]) -> _T:
+        """Run `factory` unless the same read is in flight or just answered.
+
+        The result is shared between callers as is: treat it as read-only.
+        Reads issued on behalf of a write are never shared.
+        """
+        if current_priority() is Priority.WRITE:
+            return await factory()
+
+        while True:
+            recent = self._recent.get(key)
+            if recent is not None and recent[0] > self._clock():
+                self.coalesced += 1
+                return recent[1]
+            fut = self._inflight.get(key)
+            if fut is None:
+                break
+            try:
+                result = await asyncio.shield(fut)
+            except asyncio.CancelledError:
+                if not fut.cancelled():
+                    raise
+                # the caller doing the read gave up: do it ourselves
+                continue
+            self.coalesced += 1
+            return result
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        generation = self._generation
+        try:
+            result = await factory()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except BaseException as err:
+            fut.set_exception(err)
+            # followers re-raise it; don't warn when there are none
+            fut.exception()
+            raise
+        finally:
+            if self._inflight.get(key) is fut:
+                del self._inflight[key]
+
+        fut.set_result(result)
+        if generation == self._generation:
+            now = self._clock()
+            self._recent = {k: v for k, v in self._recent.items() if v[0] > now}
+            self._recent[key] = (now + self._window, result)
+        return result
+
+    def invalidate(self) -> None:
+        """Something was written: nothing read before may be shared anymore."""
+        self._generation += 1
+        self._inflight.clear()
+        self._recent.clear()
+
+    def as_dict(self) -> dict[str, Any]:
+        self._refill()
+        return {
+            "tokens": round(self._tokens, 2),
+            "waiting": sum(1 for w in self._waiters if not w[2].done()),
+            "granted": dict(self.granted),
+            "queued": self.queued,
+            "coalesced": self.coalesced,
+            "max_wait_s": round(self.max_wait, 3),
+        }
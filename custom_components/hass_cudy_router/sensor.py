@@ -1,16 +1,18 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, Callable
 
-from homeassistant.components.sensor import SensorEntity
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import PERCENTAGE, UnitOfTime
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .const import *
-from .coordinator import CudyCoordinator
+from .coordinator import CudyCoordinator, iter_coordinators
+from .metrics import RequestMetrics
 
 
 @dataclass(frozen=True)
@@ -23,14 +25,67 @@ class _SensorDef:
     translation_key: str
 
 
+@dataclass(frozen=True)
+class _MetricDef:
+    key: str
+    unit: str
+    device_class: SensorDeviceClass | None
+    value: Callable[[RequestMetrics], Any]
+
+
+def _last_poll_duration(metrics: RequestMetrics) -> float | None:
+    poll = metrics.last_poll
+    return round(poll.duration, 2) if poll else None
+
+
+def _latency_p95_ms(metrics: RequestMetrics) -> float | None:
+    p95 = metrics.latency_percentile(95)
+    return round(p95 * 1000, 1) if p95 is not None else None
+
+
+def _error_rate_pct(metrics: RequestMetrics) -> float | None:
+    rate = metrics.error_rate()
+    return round(rate * 100, 1) if rate is not None else None
+
+
+METRIC_SENSORS: tuple[_MetricDef, ...] = (
+    _MetricDef(SENSOR_POLL_DURATION, UnitOfTime.SECONDS, SensorDeviceClass.DURATION, _last_poll_duration),
+    _MetricDef(SENSOR_REQUEST_LATENCY_P95, UnitOfTime.MILLISECONDS, SensorDeviceClass.DURATION, _latency_p95_ms),
+    _MetricDef(SENSOR_REQUEST_ERROR_RATE, PERCENTAGE, None, _error_rate_pct),
+)
+
+
 async def async_setup_entry(
     hass: HomeAssistant,
     entry: ConfigEntry,
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     data = hass.data[DOMAIN][entry.entry_id]
-    coordinator: CudyCoordinator = data["coordinator"]
 
+    # model/firmware live in the primary coordinator, whatever the sensor's tier
+    primary: CudyCoordinator = data["coordinator"]
+
+    entities: list[SensorEntity] = []
+    for coordinator in iter_coordinators(data):
+        entities.extend(_build_sensors(coordinator, entry, primary))
+
+    options = getattr(entry, "options", None) or {}
+    metrics = getattr(data.get("client"), "metrics", None)
+    if options.get(CONF_DIAGNOSTIC_SENSORS, DEFAULT_DIAGNOSTIC_SENSORS) and isinstance(metrics, RequestMetrics):
+        coordinators = iter_coordinators(data)
+        entities.extend(
+            CudyMetricSensor(entry, metrics, metric_def, coordinators, primary)
+            for metric_def in METRIC_SENSORS
+        )
+
+    async_add_entities(entities)
+
+
+def _build_sensors(
+    coordinator: CudyCoordinator,
+    entry: ConfigEntry,
+    primary: CudyCoordinator,
+) -> list[CudySensor]:
     entities: list[CudySensor] = []
     modules: dict[str, dict[str, Any]] = coordinator.data or {}
 
@@ -59,6 +114,7 @@ async def async_setup_entry(
                 CudySensor(
                     coordinator=coordinator,
                     entry=entry,
+                    system_coordinator=primary,
                     sensor_def=_SensorDef(
                         module=module_name,
                         key=sensor_key,
@@ -70,7 +126,7 @@ async def async_setup_entry(
                 )
             )
 
-    async_add_entities(entities)
+    return entities
 
 
 class CudySensor(SensorEntity):
@@ -81,8 +137,10 @@ class CudySensor(SensorEntity):
         coordinator: CudyCoordinator,
         entry: ConfigEntry,
         sensor_def: _SensorDef,
+        system_coordinator: CudyCoordinator | None = None,
     ) -> None:
         self.coordinator = coordinator
+        self._system_coordinator = system_coordinator or coordinator
         self._entry = entry
         self._def = sensor_def
 
@@ -90,7 +148,7 @@ class CudySensor(SensorEntity):
             f"{entry.entry_id}_{sensor_def.module}_{sensor_def.key}"
         )
 
-        system = (self.coordinator.data or {}).get(MODULE_SYSTEM, {})
+        system = (self._system_coordinator.data or {}).get(MODULE_SYSTEM, {})
         model = None
         if isinstance(system, dict):
             model = system.get(SENSOR_SYSTEM_MODEL)
@@ -125,19 +183,62 @@ class CudySensor(SensorEntity):
 
     @property
     def device_info(self) -> DeviceInfo:
-        entry_uid = self._entry.entry_id
+        return _device_info(self._entry, self._system_coordinator)
 
-        model = None
-        sw_version = None
-        system = (self.coordinator.data or {}).get(MODULE_SYSTEM, {})
-        if isinstance(system, dict):
-            model = system.get(SENSOR_SYSTEM_MODEL)
-            sw_version = system.get(SENSOR_SYSTEM_FIRMWARE_VERSION)
-
-        return DeviceInfo(
-            identifiers={(DOMAIN, entry_uid)},
-            name=f"Cudy Router {model}" if model else "Cudy Router",
-            manufacturer="Cudy",
-            model=model,
-            sw_version=sw_version,
-        )
\ No newline at end of file
+
+class CudyMetricSensor(SensorEntity):
+    """Diagnostic sensor over the client's request metrics."""
+
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(
+        self,
+        entry: ConfigEntry,
+        metrics: RequestMetrics,
+        metric_def: _MetricDef,
+        coordinators: list[CudyCoordinator],
+        system_coordinator: CudyCoordinator,
+    ) -> None:
+        self._entry = entry
+        self._metrics = metrics
+        self._def = metric_def
+        self._coordinators = coordinators
+        self._system_coordinator = system_coordinator
+
+        self._attr_unique_id = f"{entry.entry_id}_metrics_{metric_def.key}"
+        self._attr_translation_key = metric_def.key
+        self._attr_native_unit_of_measurement = metric_def.unit
+        self._attr_device_class = metric_def.device_class
+
+    @property
+    def native_value(self) -> Any:
+        return self._def.value(self._metrics)
+
+    async def async_added_to_hass(self) -> None:
+        # metrics move with every poll, whatever the tier
+        for coordinator in self._coordinators:
+            self.async_on_remove(coordinator.async_add_listener(self.async_write_ha_state))
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        return _device_info(self._entry, self._system_coordinator)
+
+
+def _device_info(entry: ConfigEntry, system_coordinator: CudyCoordinator) -> DeviceInfo:
+    model = None
+    sw_version = None
+    system = (system_coordinator.data or {}).get(MODULE_SYSTEM, {})
+    if isinstance(system, dict):
+        model = system.get(SENSOR_SYSTEM_MODEL)
+        sw_version = system.get(SENSOR_SYSTEM_FIRMWARE_VERSION)
+
+    return DeviceInfo(
+        identifiers={(DOMAIN, entry.entry_id)},
+        name=f"Cudy Router {model}" if model else "Cudy Router",
+        manufacturer="Cudy",
+        model=model,
+        sw_version=sw_version,
+    )
\ No newline at end of file
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import logging
+from typing import Any, Callable
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 10
+
+
+class CudyStore:
+    """Per config entry state persisted in HA `.storage`.
+
+    Runtime components register a section name and a provider returning the
+    JSON-serializable data to write; saves are debounced.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}", private=True
+        )
+        self._providers: dict[str, Callable[[], Any]] = {}
+        self.data: dict[str, Any] = {}
+
+    async def async_load(self) -> dict[str, Any]:
+        try:
+            data = await self._store.async_load()
+        except Exception:
+            _LOGGER.debug("Unable to load stored state, starting empty", exc_info=True)
+            data = None
+        self.data = data if isinstance(data, dict) else {}
+        return self.data
+
+    def register(self, section: str, provider: Callable[[], Any]) -> None:
+        self._providers[section] = provider
+
+    @callback
+    def async_schedule_save(self) -> None:
+        self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    async def async_remove(self) -> None:
+        await self._store.async_remove()
+
+    def _data_to_save(self) -> dict[str, Any]:
+        for section, provider in self._providers.items():
+            self.data[section] = provider()
+        return self.data
@@ -1,13 +1,16 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import Any
+from typing import Any, Awaitable, Callable
 
+from homeassistant.components import persistent_notification
 from homeassistant.components.switch import SwitchEntity, SwitchEntityDescription
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import (
     DOMAIN,
@@ -15,7 +18,10 @@ from .const import (
     SENSOR_SYSTEM_MODEL,
     SENSOR_SYSTEM_FIRMWARE_VERSION,
     SENSOR_SYSTEM_HARDWARE,
+    SWITCH_APPLY_TIMEOUT,
+    SWITCH_CONFIRM_RETRY,
 )
+from .coordinator import CudyControlCoordinator
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -47,36 +53,167 @@ ZEROTIER = SwitchEntityDescription(
 async def async_setup_entry(
     hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
 ) -> None:
+    data = hass.data.get(DOMAIN, {}).get(entry.entry_id, {})
+    coordinator = data.get("control_coordinator")
+    if coordinator is None:
+        # integration object without one: poll the client here
+        coordinator = CudyControlCoordinator(hass, entry, data.get("client"), host=entry.data.get("host"))
+        data["control_coordinator"] = coordinator
+        await coordinator.async_refresh()
+
     async_add_entities(
         [
-            CudyWifiSwitch(hass, entry, band="2g", description=WIFI_24),
-            CudyWifiSwitch(hass, entry, band="5g", description=WIFI_5),
-            CudyVpnSwitch(hass, entry, description=VPN_WIREGUARD),
-            CudyZeroTierSwitch(hass, entry, description=ZEROTIER),
+            CudyWifiSwitch(hass, entry, coordinator, band="2g", description=WIFI_24),
+            CudyWifiSwitch(hass, entry, coordinator, band="5g", description=WIFI_5),
+            CudyVpnSwitch(hass, entry, coordinator, description=VPN_WIREGUARD),
+            CudyZeroTierSwitch(hass, entry, coordinator, description=ZEROTIER),
         ]
     )
 
 
-class CudyWifiSwitch(SwitchEntity):
+class _CudyControlSwitch(CoordinatorEntity[CudyControlCoordinator], SwitchEntity):
+    """Switch whose state comes from the shared control coordinator."""
+
+    # key of the control state dict ("2g", "5g", "wireguard", "zerotier")
+    _state_key: str
+
+    def __init__(self, coordinator: CudyControlCoordinator) -> None:
+        super().__init__(coordinator)
+        # changes are applied one after the other, in the background
+        self._apply_lock = asyncio.Lock()
+        self._applying = 0
+        # state shown while changes are being applied
+        self._optimistic: bool | None = None
+        self._apply_task: asyncio.Task[None] | None = None
+        # seconds the last successful change took to be applied
+        self._last_apply_duration: float | None = None
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self._update_from_coordinator()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        self._update_from_coordinator()
+        super()._handle_coordinator_update()
+
+    def _update_from_coordinator(self) -> None:
+        if self._optimistic is not None:
+            # the router may not reflect a change being applied yet
+            return
+        if not self.coordinator.last_update_success:
+            # data is what was read before the failure: don't go back to it
+            return
+        # a page that could not be read keeps the last known state
+        st = self.coordinator.data
+        if isinstance(st, dict) and self._state_key in st:
+            self._attr_is_on = bool(st[self._state_key])
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        return {"applying": self._applying > 0, "last_apply_duration": self._last_apply_duration}
+
+    @property
+    def _notification_id(self) -> str:
+        return f"{DOMAIN}_{self.unique_id}_apply"
+
+    async def _async_toggle(self, enabled: bool, apply: Callable[[bool], Awaitable[bool]]) -> None:
+        """Show `enabled` right away and apply it to the router in the background.
+
+        Applying (form POST + service restart on the router) takes up to half
+        a minute; the service call returns as soon as the change is queued.
+        """
+        previous = bool(self._attr_is_on)
+        self._applying += 1
+        self._optimistic = enabled
+        self._attr_is_on = enabled
+        self.async_write_ha_state()
+        self._apply_task = self._entry.async_create_background_task(
+            self.hass,
+            self._async_apply(enabled, previous, apply),
+            f"{DOMAIN} apply {self.entity_id}",
+        )
+
+    async def _async_apply(self, enabled: bool, previous: bool, apply: Callable[[bool], Awaitable[bool]]) -> None:
+        error: str | None = None
+        confirmed = False
+        try:
+            async with self._apply_lock:
+                started = self.hass.loop.time()
+                try:
+                    async with asyncio.timeout(SWITCH_APPLY_TIMEOUT):
+                        if not await apply(enabled):
+                            error = "the router did not accept the change"
+                except TimeoutError:
+                    error = f"not applied within {SWITCH_APPLY_TIMEOUT} s"
+                except Exception as err:
+                    error = str(err) or type(err).__name__
+
+                if error is None:
+                    self._last_apply_duration = round(self.hass.loop.time() - started, 1)
+                    # confirm with what the router reports now; a failed read
+                    # leaves the old snapshot in data, which proves nothing
+                    await self.coordinator.async_refresh()
+                    if not self.coordinator.last_update_success:
+                        await asyncio.sleep(SWITCH_CONFIRM_RETRY)
+                        await self.coordinator.async_refresh()
+                    if self.coordinator.last_update_success:
+                        confirmed = True
+                        actual = (self.coordinator.data or {}).get(self._state_key)
+                        if actual is not None and bool(actual) != enabled:
+                            error = f"the router still reports it {'on' if actual else 'off'}"
+        finally:
+            self._applying -= 1
+
+        if error is None:
+            persistent_notification.async_dismiss(self.hass, self._notification_id)
+        else:
+            _LOGGER.warning("Turning %s %s failed: %s", self.entity_id, "on" if enabled else "off", error)
+            persistent_notification.async_create(
+                self.hass,
+                f"Turning {self.name} {'on' if enabled else 'off'} on {self._host or 'the router'} "
+                f"failed: {error}. The switch was reverted.",
+                title="Cudy Router",
+                notification_id=self._notification_id,
+            )
+
+        if self._applying:
+            # a later change is queued: it decides what is shown
+            return
+        self._optimistic = None
+        if error is not None:
+            self._attr_is_on = previous
+        elif confirmed:
+            self._update_from_coordinator()
+        else:
+            # applied but not read back yet: keep showing it until a poll succeeds
+            _LOGGER.debug("Could not read back %s after applying it", self.entity_id)
+        self.async_write_ha_state()
+
+
+class CudyWifiSwitch(_CudyControlSwitch):
     _attr_has_entity_name = True
 
     def __init__(
         self,
         hass: HomeAssistant,
         entry: ConfigEntry,
+        coordinator: CudyControlCoordinator,
         band: str,
         description: SwitchEntityDescription,
     ) -> None:
+        super().__init__(coordinator)
         self.hass = hass
         self._entry = entry
         self._band = band  # "2g" / "5g"
+        self._state_key = band
         self.entity_description = description
 
         entry_data = getattr(entry, "data", {}) or {}
         self._host = entry_data.get("host", "") if isinstance(entry_data, dict) else ""
 
         self._attr_unique_id = f"{entry.entry_id}_wifi_{band}"
-        self._attr_is_on = False  # verrà valorizzato da async_update
+        self._attr_is_on = False  # verrà valorizzato dal control coordinator
 
     def _get_objects(self) -> tuple[Any, Any, Any]:
         data = self.hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {})
@@ -104,43 +241,13 @@ class CudyWifiSwitch(SwitchEntity):
             sw_version=sw_version,
         )
 
-    async def async_added_to_hass(self) -> None:
-        await self.async_update()
-        self.async_write_ha_state()
+    async def async_turn_on(self, **kwargs: Any) -> None:
+        await self._async_toggle(True, self._set_wifi)
 
-    async def async_update(self) -> None:
-        """Legge lo stato reale dal router (se supportato dal client)."""
-        client, integration, coordinator = self._get_objects()
+    async def async_turn_off(self, **kwargs: Any) -> None:
+        await self._async_toggle(False, self._set_wifi)
 
-        # prefer client, ma accettiamo anche integration/coordinator se espongono async_get_wifi_state()
-        getter = None
-        for obj in (client, integration, coordinator):
-            fn = getattr(obj, "async_get_wifi_state", None)
-            if callable(fn):
-                getter = fn
-                break
-
-        if not getter:
-            # niente lettura stato -> non inventiamo cose
-            return
-
-        try:
-            st = await getter()  # atteso: {"2g": bool, "5g": bool}
-            if isinstance(st, dict):
-                if self._band == "2g" and "2g" in st:
-                    self._attr_is_on = bool(st["2g"])
-                elif self._band == "5g" and "5g" in st:
-                    self._attr_is_on = bool(st["5g"])
-        except Exception as e:
-            _LOGGER.debug("Wi-Fi state read failed (%s): %s", self._band, e)
-
-    async def async_turn_on(self) -> None:
-        await self._set_wifi(True)
-
-    async def async_turn_off(self) -> None:
-        await self._set_wifi(False)
-
-    async def _set_wifi(self, enabled: bool) -> None:
+    async def _set_wifi(self, enabled: bool) -> bool:
         client, integration, coordinator = self._get_objects()
 
         # Prova async_set_wifi(band, enabled) dove disponibile
@@ -153,28 +260,27 @@ class CudyWifiSwitch(SwitchEntity):
 
         if not setter:
             _LOGGER.error("Wi-Fi switch pressed but no async_set_wifi() found in integration/coordinator/client")
-            return
+            return False
 
         try:
-            await setter(self._band, enabled)
+            result = await setter(self._band, enabled)
         except TypeError:
             # compat: alcune implementazioni accettano solo (enabled)
-            await setter(enabled)
-
-        # Dopo il comando: rileggi lo stato reale e aggiorna HA
-        await self.async_update()
-        self.async_write_ha_state()
+            result = await setter(enabled)
+        return result is not False
 
 
-class CudyVpnSwitch(SwitchEntity):
+class CudyVpnSwitch(_CudyControlSwitch):
     _attr_has_entity_name = True
 
     def __init__(
         self,
         hass: HomeAssistant,
         entry: ConfigEntry,
+        coordinator: CudyControlCoordinator,
         description: SwitchEntityDescription,
     ) -> None:
+        super().__init__(coordinator)
         self.hass = hass
         self._entry = entry
         self.entity_description = description
@@ -183,6 +289,7 @@ class CudyVpnSwitch(SwitchEntity):
         self._host = entry_data.get("host", "") if isinstance(entry_data, dict) else ""
 
         self._attr_unique_id = f"{entry.entry_id}_vpn_wireguard"
+        self._state_key = "wireguard"
         self._attr_is_on = False
 
     def _get_objects(self) -> tuple[Any, Any, Any]:
@@ -211,36 +318,13 @@ class CudyVpnSwitch(SwitchEntity):
             sw_version=sw_version,
         )
 
-    async def async_added_to_hass(self) -> None:
-        await self.async_update()
-        self.async_write_ha_state()
+    async def async_turn_on(self, **kwargs: Any) -> None:
+        await self._async_toggle(True, self._set_vpn)
 
-    async def async_update(self) -> None:
-        client, integration, coordinator = self._get_objects()
+    async def async_turn_off(self, **kwargs: Any) -> None:
+        await self._async_toggle(False, self._set_vpn)
 
-        getter = None
-        for obj in (client, integration, coordinator):
-            fn = getattr(obj, "async_get_vpn_state", None)
-            if callable(fn):
-                getter = fn
-                break
-        if not getter:
-            return
-
-        try:
-            st = await getter()  # atteso: {"wireguard": bool}
-            if isinstance(st, dict) and "wireguard" in st:
-                self._attr_is_on = bool(st["wireguard"])
-        except Exception as e:
-            _LOGGER.debug("VPN state read failed: %s", e)
-
-    async def async_turn_on(self) -> None:
-        await self._set_vpn(True)
-
-    async def async_turn_off(self) -> None:
-        await self._set_vpn(False)
-
-    async def _set_vpn(self, enabled: bool) -> None:
+    async def _set_vpn(self, enabled: bool) -> bool:
         client, integration, coordinator = self._get_objects()
 
         setter = None
@@ -251,27 +335,23 @@ class CudyVpnSwitch(SwitchEntity):
                 break
         if not setter:
             _LOGGER.error("VPN switch pressed but no async_set_vpn() found in integration/coordinator/client")
-            return
+            return False
 
-        try:
-            await setter(enabled)
-        except Exception as e:
-            _LOGGER.error("VPN set failed: %s", e)
-            return
-
-        await self.async_update()
-        self.async_write_ha_state()
+        # errors are reported by _async_apply
+        return await setter(enabled) is not False
 
 
-class CudyZeroTierSwitch(SwitchEntity):
+class CudyZeroTierSwitch(_CudyControlSwitch):
     _attr_has_entity_name = True
 
     def __init__(
         self,
         hass: HomeAssistant,
         entry: ConfigEntry,
+        coordinator: CudyControlCoordinator,
         description: SwitchEntityDescription,
     ) -> None:
+        super().__init__(coordinator)
         self.hass = hass
         self._entry = entry
         self.entity_description = description
@@ -280,6 +360,7 @@ class CudyZeroTierSwitch(SwitchEntity):
         self._host = entry_data.get("host", "") if isinstance(entry_data, dict) else ""
 
         self._attr_unique_id = f"{entry.entry_id}_zerotier"
+        self._state_key = "zerotier"
         self._attr_is_on = False
 
     def _get_objects(self) -> tuple[Any, Any, Any]:
@@ -308,36 +389,13 @@ class CudyZeroTierSwitch(SwitchEntity):
             sw_version=sw_version,
         )
 
-    async def async_added_to_hass(self) -> None:
-        await self.async_update()
-        self.async_write_ha_state()
+    async def async_turn_on(self, **kwargs: Any) -> None:
+        await self._async_toggle(True, self._set_zerotier)
 
-    async def async_update(self) -> None:
-        client, integration, coordinator = self._get_objects()
+    async def async_turn_off(self, **kwargs: Any) -> None:
+        await self._async_toggle(False, self._set_zerotier)
 
-        getter = None
-        for obj in (client, integration, coordinator):
-            fn = getattr(obj, "async_get_zerotier_state", None)
-            if callable(fn):
-                getter = fn
-                break
-        if not getter:
-            return
-
-        try:
-            st = await getter()
-            if isinstance(st, dict) and "zerotier" in st:
-                self._attr_is_on = bool(st["zerotier"])
-        except Exception as e:
-            _LOGGER.debug("ZeroTier state read failed: %s", e)
-
-    async def async_turn_on(self) -> None:
-        await self._set_zerotier(True)
-
-    async def async_turn_off(self) -> None:
-        await self._set_zerotier(False)
-
-    async def _set_zerotier(self, enabled: bool) -> None:
+    async def _set_zerotier(self, enabled: bool) -> bool:
         client, integration, coordinator = self._get_objects()
 
         setter = None
@@ -348,13 +406,7 @@ class CudyZeroTierSwitch(SwitchEntity):
                 break
         if not setter:
             _LOGGER.error("ZeroTier switch pressed but no async_set_zerotier() found in integration/coordinator/client")
-            return
+            return False
 
-        try:
-            await setter(enabled)
-        except Exception as e:
-            _LOGGER.error("ZeroTier set failed: %s", e)
-            return
-
-        await self.async_update()
-        self.async_write_ha_state()
+        # errors are reported by _async_apply
+        return await setter(enabled) is not False
@@ -27,4 +27,69 @@ class FakeClient:
     async def get(self, path: str):
         if path in self._mapping.keys():
             return self._mapping[path]
-        return ""
\ No newline at end of file
+        return ""
+
+
+LOGIN_PAGE = """<form method="post"><input name="luci_username" />
+<input type="password" name="luci_password" /></form>"""
+
+
+class FakeContent:
+    """Body stream of a response, delivered in chunks of at most `chunk` bytes."""
+
+    def __init__(self, body: bytes, chunk: int | None = None) -> None:
+        self._body = body
+        self._chunk = chunk
+        self.total_bytes = 0
+
+    async def iter_chunked(self, n: int):
+        n = min(n, self._chunk or n)
+        for start in range(0, len(self._body), n):
+            chunk = self._body[start : start + n]
+            self.total_bytes += len(chunk)
+            yield chunk
+
+
+class FakeResponse:
+    url = "http://192.168.10.1/cgi-bin/luci"
+    charset = "utf-8"
+    content_length = None
+
+    def __init__(self, status: int, text: str = "") -> None:
+        self.status = status
+        self.headers: dict[str, str] = {"Content-Type": "text/html"}
+        self._text = text
+        self.content = FakeContent(text.encode())
+
+    async def __aenter__(self) -> "FakeResponse":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        return None
+
+    def raise_for_status(self) -> None:
+        assert self.status < 400
+
+    async def text(self) -> str:
+        return self._text
+
+
+class FakeSession:
+    """Router whose only valid session cookie is `valid`."""
+
+    closed = False
+
+    def __init__(self, valid: str, *, login_page: bool = False) -> None:
+        self.valid = valid
+        # answer an expired session with 200 + login form instead of 403
+        self.login_page = login_page
+        self.requests: list[str | None] = []
+
+    def request(self, method: str, url: str, *, headers: dict[str, str], **kwargs) -> FakeResponse:
+        cookie = headers.get("Cookie")
+        self.requests.append(cookie)
+        if cookie != f"sysauth={self.valid}":
+            if self.login_page:
+                return FakeResponse(200, LOGIN_PAGE)
+            return FakeResponse(403)
+        return FakeResponse(200, "ok")
@@ -1,8 +1,12 @@
+import asyncio
+
+import aiohttp
 import pytest
 
 from custom_components.hass_cudy_router.api import CudyApi
+from custom_components.hass_cudy_router.client import AuthenticationFailed
 from custom_components.hass_cudy_router.const import *
-from tests.cudy_router.fixtures import FakeClient
+from tests.cudy_router.fixtures import FakeClient, read_html
 
 
 @pytest.mark.asyncio
@@ -14,4 +18,284 @@ async def test_api_get_data(model: str) -> None:
     data = await api.get_data()
 
     assert MODULE_SYSTEM in data
-    assert MODULE_DEVICES in data
\ No newline at end of file
+    assert MODULE_DEVICES in data
+
+
+class SlowClient:
+    def __init__(self, pages: dict[str, str]) -> None:
+        self._pages = pages
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls: list[str] = []
+
+    async def get(self, path: str):
+        self.calls.append(path)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            return self._pages.get(path, "")
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("limit", [1, 2, 3])
+async def test_api_get_data_bounded_concurrency(limit: int) -> None:
+    client = SlowClient({})
+    api = CudyApi(client, max_concurrency=limit)
+
+    await api.get_data()
+
+    assert client.max_in_flight == limit
+
+
+@pytest.mark.asyncio
+async def test_api_get_data_keeps_fallback_order() -> None:
+    system = read_html("WR3600", "system.html")
+    client = SlowClient({CudyApi.luci(CAPABILITY_URLS[MODULE_SYSTEM][1]): system})
+    api = CudyApi(client, max_concurrency=3)
+
+    data = await api.get_data()
+
+    system_calls = [c for c in client.calls if c.startswith(CudyApi.luci("/admin/system/status"))]
+    assert system_calls == [CudyApi.luci(url) for url in CAPABILITY_URLS[MODULE_SYSTEM]]
+    assert data[MODULE_SYSTEM][SENSOR_SYSTEM_FIRMWARE_VERSION]
+
+
+@pytest.mark.asyncio
+async def test_api_get_data_reuses_resolved_urls() -> None:
+    system = read_html("WR3600", "system.html")
+    vpn = read_html("WR3600", "vpn.html")
+    client = SlowClient(
+        {
+            CudyApi.luci(CAPABILITY_URLS[MODULE_SYSTEM][1]): system,
+            CudyApi.luci(CAPABILITY_URLS[MODULE_VPN][2]): vpn,
+        }
+    )
+    api = CudyApi(client)
+
+    first = await api.get_data()
+    assert api.url_cache.get(MODULE_SYSTEM) == CAPABILITY_URLS[MODULE_SYSTEM][1]
+    assert api.url_cache.get(MODULE_VPN) == CAPABILITY_URLS[MODULE_VPN][2]
+    assert api.url_cache.firmware == first[MODULE_SYSTEM][SENSOR_SYSTEM_FIRMWARE_VERSION]
+
+    client.calls.clear()
+    second = await api.get_data()
+
+    assert second == first
+    assert client.calls.count(CudyApi.luci(CAPABILITY_URLS[MODULE_SYSTEM][1])) == 1
+    assert CudyApi.luci(CAPABILITY_URLS[MODULE_SYSTEM][0]) not in client.calls
+    assert [c for c in client.calls if "/admin/network/vpn" in c] == [
+        CudyApi.luci(CAPABILITY_URLS[MODULE_VPN][2])
+    ]
+
+
+@pytest.mark.asyncio
+async def test_api_get_data_reprobes_stale_url_once() -> None:
+    system = read_html("WR3600", "system.html")
+    pages = {CudyApi.luci(CAPABILITY_URLS[MODULE_SYSTEM][1]): system}
+    client = SlowClient(pages)
+    api = CudyApi(client)
+    await api.get_data()
+
+    # Firmware moved the page back to the first URL
+    pages.clear()
+    pages[CudyApi.luci(CAPABILITY_URLS[MODULE_SYSTEM][0])] = system
+    client.calls.clear()
+
+    data = await api.get_data()
+
+    assert MODULE_SYSTEM in data
+    system_calls = [c for c in client.calls if c.startswith(CudyApi.luci("/admin/system/status"))]
+    assert system_calls == [
+        CudyApi.luci(CAPABILITY_URLS[MODULE_SYSTEM][1]),
+        CudyApi.luci(CAPABILITY_URLS[MODULE_SYSTEM][0]),
+    ]
+    assert api.url_cache.get(MODULE_SYSTEM) == CAPABILITY_URLS[MODULE_SYSTEM][0]
+
+
+@pytest.mark.asyncio
+async def test_api_get_data_skips_absent_modules() -> None:
+    system = read_html("AP3000", "system.html")
+    client = SlowClient({CudyApi.luci(CAPABILITY_URLS[MODULE_SYSTEM][0]): system})
+    api = CudyApi(client)
+
+    for _ in range(NEGATIVE_CACHE_THRESHOLD):
+        await api.get_data()
+
+    assert api.capabilities.is_absent(MODULE_GSM)
+    assert not api.capabilities.is_absent(MODULE_SYSTEM)
+
+    client.calls.clear()
+    data = await api.get_data()
+
+    assert MODULE_SYSTEM in data
+    assert client.calls == [CudyApi.luci(CAPABILITY_URLS[MODULE_SYSTEM][0])]
+
+    api.reset_capabilities()
+    client.calls.clear()
+    await api.get_data()
+    assert CudyApi.luci(CAPABILITY_URLS[MODULE_GSM][0]) in client.calls
+
+
+GSM_SHELL = """
+<html><body><div id="status"></div>
+<script type="text/javascript">
+cbi_xhr_load('/cgi-bin/luci/admin/network/gcom/info?iface=4g');
+cbi_xhr_load('/cgi-bin/luci/admin/network/gcom/sim?iface=4g');
+</script></body></html>
+"""
+
+
+@pytest.mark.asyncio
+async def test_api_get_data_caches_xhr_shell_endpoints() -> None:
+    system = read_html("P4", "system.html")
+    status_frag = "<table><tr><td>Network Type</td><td>LTE</td></tr><tr><td>RSSI</td><td>-61 dBm</td></tr></table>"
+    sim_frag = "<table><tr><td>IMEI</td><td>861234567890123</td></tr></table>"
+    shell_url = CudyApi.luci(CAPABILITY_URLS[MODULE_GSM][2])
+    client = SlowClient(
+        {
+            CudyApi.luci(CAPABILITY_URLS[MODULE_SYSTEM][0]): system,
+            shell_url: GSM_SHELL,
+            "/cgi-bin/luci/admin/network/gcom/info?iface=4g": status_frag,
+            "/cgi-bin/luci/admin/network/gcom/sim?iface=4g": sim_frag,
+        }
+    )
+    api = CudyApi(client, max_concurrency=3)
+
+    first = await api.get_data()
+
+    gsm = first[MODULE_GSM]
+    assert gsm[SENSOR_GSM_NETWORK_TYPE] == "LTE"
+    assert gsm[SENSOR_GSM_RSSI] == -61
+    assert gsm[SENSOR_GSM_IMEI] == "861234567890123"
+    assert shell_url in client.calls
+
+    client.calls.clear()
+    second = await api.get_data()
+
+    assert second[MODULE_GSM] == gsm
+    assert [c for c in client.calls if "/gcom" in c and "/sms/" not in c] == [
+        "/cgi-bin/luci/admin/network/gcom/info?iface=4g",
+        "/cgi-bin/luci/admin/network/gcom/sim?iface=4g",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_api_get_data_reuses_parse_of_unchanged_page(monkeypatch) -> None:
+    import custom_components.hass_cudy_router.api as api_module
+
+    system = read_html("WR3600", "system.html")
+    client = SlowClient({CudyApi.luci(CAPABILITY_URLS[MODULE_SYSTEM][1]): system})
+    api = CudyApi(client)
+
+    parsed: list[str] = []
+    real_parse = api_module.parse_html
+
+    def counting_parse(module, html):
+        parsed.append(module)
+        return real_parse(module, html)
+
+    monkeypatch.setattr(api_module, "parse_html", counting_parse)
+
+    first = await api.get_data(modules=[MODULE_SYSTEM])
+    first[MODULE_SYSTEM]["mutated"] = True
+    second = await api.get_data(modules=[MODULE_SYSTEM])
+
+    assert parsed == [MODULE_SYSTEM]
+    assert "mutated" not in second[MODULE_SYSTEM]
+    assert second[MODULE_SYSTEM][SENSOR_SYSTEM_FIRMWARE_VERSION] == first[MODULE_SYSTEM][SENSOR_SYSTEM_FIRMWARE_VERSION]
+    assert api.parse_cache.hits == 1
+
+
+class HangingClient(SlowClient):
+    """Answers from `pages`, never answers on `hanging` paths."""
+
+    def __init__(self, pages: dict[str, str], hanging: set[str]) -> None:
+        super().__init__(pages)
+        self.hanging = hanging
+        self.cancelled = 0
+
+    async def get(self, path: str):
+        if path in self.hanging:
+            try:
+                await asyncio.sleep(3600)
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+        return await super().get(path)
+
+
+@pytest.mark.asyncio
+async def test_api_get_data_returns_partial_result_when_budget_runs_out() -> None:
+    system = read_html("WR3600", "system.html")
+    lan = read_html("WR3600", "lan.html")
+    lan_path = CudyApi.luci(CAPABILITY_URLS[MODULE_LAN][0])
+    client = HangingClient(
+        {CudyApi.luci(CAPABILITY_URLS[MODULE_SYSTEM][1]): system, lan_path: lan},
+        hanging=set(),
+    )
+    api = CudyApi(client, max_concurrency=4)
+
+    first = await api.get_data(modules=[MODULE_SYSTEM, MODULE_LAN], budget=5)
+    assert MODULE_LAN in first
+
+    client.hanging = {lan_path}
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    second = await api.get_data(modules=[MODULE_SYSTEM, MODULE_LAN], budget=0.2)
+
+    assert loop.time() - start < 1
+    assert client.cancelled == 1
+    assert second[MODULE_SYSTEM] == first[MODULE_SYSTEM]
+    # the module that ran out of time keeps its previous data
+    assert second[MODULE_LAN] == first[MODULE_LAN]
+    assert not api.capabilities.is_absent(MODULE_LAN)
+
+
+class FailingClient(SlowClient):
+    """Answers from `pages`, raises `errors[path]` for the paths listed there."""
+
+    def __init__(self, pages: dict[str, str], errors: dict[str, BaseException]) -> None:
+        super().__init__(pages)
+        self.errors = errors
+
+    async def get(self, path: str):
+        if path in self.errors:
+            raise self.errors[path]
+        return await super().get(path)
+
+
+@pytest.mark.asyncio
+async def test_api_get_data_keeps_other_modules_when_one_times_out() -> None:
+    system = read_html("WR3600", "system.html")
+    lan = read_html("WR3600", "lan.html")
+    lan_path = CudyApi.luci(CAPABILITY_URLS[MODULE_LAN][0])
+    client = FailingClient({CudyApi.luci(CAPABILITY_URLS[MODULE_SYSTEM][1]): system, lan_path: lan}, errors={})
+    api = CudyApi(client)
+
+    first = await api.get_data(modules=[MODULE_SYSTEM, MODULE_LAN])
+
+    client.errors = {lan_path: asyncio.TimeoutError()}
+    second = await api.get_data(modules=[MODULE_SYSTEM, MODULE_LAN])
+
+    assert second[MODULE_SYSTEM] == first[MODULE_SYSTEM]
+    assert second[MODULE_LAN] == first[MODULE_LAN]
+
+    # nothing answered: the cycle fails
+    client.errors = {path: aiohttp.ClientConnectionError("down") for path in client.calls}
+    with pytest.raises(aiohttp.ClientConnectionError):
+        await api.get_data(modules=[MODULE_SYSTEM, MODULE_LAN])
+
+
+@pytest.mark.asyncio
+async def test_api_get_data_fails_on_refused_login() -> None:
+    client = FailingClient({}, errors={})
+    api = CudyApi(client)
+    client.errors = {
+        CudyApi.luci(url): AuthenticationFailed("Authentication failed") for url in CAPABILITY_URLS[MODULE_SYSTEM]
+    }
+
+    with pytest.raises(AuthenticationFailed):
+        await api.get_data(modules=[MODULE_SYSTEM, MODULE_LAN])
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+from unittest.mock import AsyncMock
+
+import aiohttp
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.update_coordinator import UpdateFailed
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.hass_cudy_router.breaker import CircuitBreaker
+from custom_components.hass_cudy_router.client import CudyClient, RouterUnavailable
+from custom_components.hass_cudy_router.const import DOMAIN
+from custom_components.hass_cudy_router.coordinator import CudyControlCoordinator, CudyCoordinator
+from tests.cudy_router.fixtures import FakeResponse
+
+
+class Attempt:
+    """A request context: nothing is sent before it is entered."""
+
+    def __init__(self, session: "DownSession", method: str) -> None:
+        self._session = session
+        self._method = method
+
+    async def __aenter__(self) -> FakeResponse:
+        self._session.calls.append(self._method)
+        if not self._session.up:
+            raise aiohttp.ClientConnectionError("connect timed out")
+        return FakeResponse(200, "ok")
+
+    async def __aexit__(self, *exc) -> None:
+        return None
+
+
+class DownSession:
+    """Router that stops answering until `up` is set."""
+
+    closed = False
+
+    def __init__(self) -> None:
+        self.up = False
+        self.calls: list[str] = []
+
+    def request(self, method: str, url: str, **kwargs) -> Attempt:
+        return Attempt(self, method)
+
+    def get(self, url: str, **kwargs) -> Attempt:
+        return Attempt(self, "GET")
+
+    def head(self, url: str, **kwargs) -> Attempt:
+        return Attempt(self, "HEAD")
+
+
+def test_breaker_opens_after_threshold_and_backs_off() -> None:
+    now = [0.0]
+    breaker = CircuitBreaker(threshold=2, backoff=(10, 60), clock=lambda: now[0])
+
+    assert not breaker.record_failure()
+    assert breaker.record_failure()
+    assert breaker.is_open
+    assert not breaker.claim_probe()
+
+    now[0] = 10.0
+    assert breaker.claim_probe()
+    # the slot is taken until the outcome is known
+    assert not breaker.claim_probe()
+
+    breaker.record_failure()
+    assert breaker.retry_in == 60
+    breaker.record_failure()
+    assert breaker.as_dict()["step"] == 1
+
+    assert breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.as_dict()["times_opened"] == 1
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_sends_nothing_but_the_heartbeat() -> None:
+    session = DownSession()
+    client = CudyClient("192.168.10.1", "admin", "secret", session=session)
+
+    for _ in range(3):
+        with pytest.raises(aiohttp.ClientConnectionError):
+            await client.get("/cgi-bin/luci/admin/status", require_auth=False)
+    assert client.breaker.is_open
+
+    with pytest.raises(RouterUnavailable):
+        await client.get("/cgi-bin/luci/admin/status", require_auth=False)
+    assert session.calls == ["GET"] * 3
+
+    assert not await client.async_probe()
+    session.up = True
+    assert await client.async_probe()
+    assert not client.breaker.is_open
+    assert await client.get("/cgi-bin/luci/admin/status", require_auth=False) == "ok"
+
+
+@pytest.mark.asyncio
+async def test_coordinator_skips_the_sweep_while_breaker_is_open(hass: HomeAssistant) -> None:
+    entry = MockConfigEntry(domain=DOMAIN, data={"host": "test"}, options={})
+    entry.add_to_hass(hass)
+
+    now = [0.0]
+    breaker = CircuitBreaker(threshold=1, backoff=(30,), clock=lambda: now[0])
+    breaker.record_failure()
+
+    api = AsyncMock()
+    api.breaker = breaker
+    api.get_data.return_value = {"system": {}}
+
+    async def probe() -> bool:
+        breaker.record_success()
+        return True
+
+    api.async_probe.side_effect = probe
+    c = CudyCoordinator(hass=hass, entry=entry, api=api, host="test", tier="fast", modules=["system"])
+
+    with pytest.raises(UpdateFailed):
+        await c._async_update_data()
+    api.async_probe.assert_not_called()
+    api.get_data.assert_not_called()
+
+    now[0] = 30.0
+    assert await c._async_update_data() == {"system": {}}
+    api.async_probe.assert_awaited_once()
+    api.get_data.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_is_not_a_failed_login(caplog) -> None:
+    session = DownSession()
+    client = CudyClient("192.168.10.1", "admin", "secret", session=session)
+    client._scheme = "http"
+    for _ in range(3):
+        client.breaker.record_failure()
+    assert client.breaker.is_open
+
+    assert not await client._login()
+    assert session.calls == []
+    assert client._scheme_failures == 0
+    assert client.scheme == "http"
+    assert "Authentication to" not in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_control_coordinator_skips_while_breaker_is_open(hass: HomeAssistant) -> None:
+    entry = MockConfigEntry(domain=DOMAIN, data={"host": "test"}, options={})
+    entry.add_to_hass(hass)
+
+    client = AsyncMock()
+    client.breaker = CircuitBreaker(threshold=1)
+    client.breaker.record_failure()
+    c = CudyControlCoordinator(hass, entry, client, host="test")
+
+    with pytest.raises(UpdateFailed):
+        await c._async_update_data()
+    client.async_get_control_state.assert_not_called()
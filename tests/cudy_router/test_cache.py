@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from custom_components.hass_cudy_router.cache import CapabilityCache, ParseCache, UrlResolutionCache
+
+
+def test_url_cache_adopts_first_firmware() -> None:
+    cache = UrlResolutionCache("192.168.10.1")
+    cache.set("system", "/a")
+
+    cache.set_firmware("2.3.4")
+
+    assert cache.get("system") == "/a"
+    assert cache.key == "192.168.10.1|2.3.4"
+
+
+def test_url_cache_drops_entries_on_firmware_change() -> None:
+    cache = UrlResolutionCache("192.168.10.1")
+    cache.set_firmware("2.3.4")
+    cache.set("system", "/a")
+
+    cache.set_firmware("2.4.0")
+
+    assert cache.get("system") is None
+
+
+def test_url_cache_roundtrip_and_host_scoping() -> None:
+    changes: list[int] = []
+    cache = UrlResolutionCache("192.168.10.1", on_change=lambda: changes.append(1))
+    cache.set_firmware("2.3.4")
+    cache.set("gsm", "/admin/network/gcom")
+    cache.set("gsm", "/admin/network/gcom")
+    assert len(changes) == 2
+
+    restored = UrlResolutionCache("192.168.10.1")
+    restored.load(cache.as_dict())
+    assert restored.get("gsm") == "/admin/network/gcom"
+    assert restored.firmware == "2.3.4"
+
+    other = UrlResolutionCache("192.168.1.1")
+    other.load(cache.as_dict())
+    assert other.get("gsm") is None
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_capability_cache_marks_absent_after_threshold() -> None:
+    clock = FakeClock()
+    caps = CapabilityCache(threshold=3, backoff=(300, 1800, 21600), clock=clock)
+
+    caps.record_miss("gsm")
+    caps.record_miss("gsm")
+    assert caps.should_fetch("gsm")
+
+    caps.record_miss("gsm")
+    assert caps.is_absent("gsm")
+    assert not caps.should_fetch("gsm")
+
+    clock.now += 300
+    assert caps.should_fetch("gsm")
+
+
+def test_capability_cache_backoff_grows_and_caps() -> None:
+    clock = FakeClock()
+    caps = CapabilityCache(threshold=1, backoff=(300, 1800, 21600), clock=clock)
+
+    caps.record_miss("sms")
+    for expected in (1800, 21600, 21600):
+        clock.now += caps.as_dict()["sms"]["next_probe_in"]
+        assert caps.should_fetch("sms")
+        caps.record_miss("sms")
+        assert caps.as_dict()["sms"]["next_probe_in"] == expected
+
+
+def test_capability_cache_hit_and_reset_clear_state() -> None:
+    caps = CapabilityCache(threshold=1, clock=FakeClock())
+    caps.record_miss("gsm")
+    caps.record_miss("sms")
+
+    caps.record_hit("gsm")
+    assert caps.should_fetch("gsm")
+    assert not caps.should_fetch("sms")
+
+    caps.reset()
+    assert caps.should_fetch("sms")
+
+
+def test_parse_cache_ignores_luci_token() -> None:
+    cache = ParseCache()
+    calls: list[str] = []
+
+    def parser(module: str, html: str) -> dict:
+        calls.append(html)
+        return {"len": len(html)}
+
+    page = '<form><input type="hidden" name="token" value="%s" /><td>Uptime</td></form>'
+    cache.parse("lan", "/a", page % "c92f19d727682a88b7a12ae7724ee65f", parser)
+    cache.parse("lan", "/a", page % "93b3c044a7f70c20591e46802f32012b", parser)
+    cache.parse("lan", "/a", page.replace("Uptime", "Uptime 1s") % "0", parser)
+
+    assert len(calls) == 2
+    assert cache.as_dict()["hits"] == 1
+    assert cache.hit_rate == round(1 / 3, 3)
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from custom_components.hass_cudy_router.client import CudyClient
+from tests.cudy_router.fixtures import FakeSession
+
+
+def _client_with_fake_login(session: FakeSession | None = None) -> tuple[CudyClient, list[str]]:
+    client = CudyClient("192.168.10.1", "admin", "secret", session=session)
+    logins: list[str] = []
+
+    async def fake_login() -> bool:
+        await asyncio.sleep(0.01)
+        logins.append("login")
+        client._set_sysauth(f"cookie{len(logins)}")
+        return True
+
+    client._login = fake_login
+    return client, logins
+
+
+@pytest.mark.asyncio
+async def test_concurrent_authenticate_shares_one_login() -> None:
+    client, logins = _client_with_fake_login()
+
+    results = await asyncio.gather(*(client.authenticate() for _ in range(5)))
+    await client.ensure_authenticated()
+
+    assert results == [True] * 5
+    assert logins == ["login"]
+    assert client.sysauth == "cookie1"
+    assert client.auth_generation == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_session_triggers_a_single_relogin() -> None:
+    session = FakeSession(valid="cookie2")
+    client, logins = _client_with_fake_login(session)
+
+    await client.authenticate()
+    assert client.sysauth == "cookie1"
+
+    # cookie1 expired on the router: every in-flight request gets a 403
+    # distinct pages: identical reads would be coalesced into one
+    results = await asyncio.gather(*(client.get(f"/cgi-bin/luci/admin/status/{i}") for i in range(5)))
+
+    assert results == ["ok"] * 5
+    assert logins == ["login", "login"]
+    assert client.auth_generation == 2
+    assert session.requests.count("sysauth=cookie1") == 5
+
+
+@pytest.mark.asyncio
+async def test_login_page_response_relogs_and_retries_once() -> None:
+    session = FakeSession(valid="cookie2", login_page=True)
+    client, logins = _client_with_fake_login(session)
+    await client.authenticate()
+
+    results = await asyncio.gather(*(client.get(f"/cgi-bin/luci/admin/status/{i}") for i in range(3)))
+
+    assert results == ["ok"] * 3
+    assert logins == ["login", "login"]
+    assert client.login_page_reauths == 3
+    assert len(session.requests) == 6
+
+
+@pytest.mark.asyncio
+async def test_session_survives_restart_until_rejected() -> None:
+    saves: list[int] = []
+    session = FakeSession(valid="cookie1")
+    client, logins = _client_with_fake_login(session)
+    client._on_session_change = lambda: saves.append(1)
+    await client.authenticate()
+    stored = client.export_session()
+    assert saves == [1]
+
+    restarted, relogins = _client_with_fake_login(FakeSession(valid="cookie1"))
+    assert restarted.restore_session(stored)
+    assert await restarted.get("/cgi-bin/luci/admin/status") == "ok"
+    assert relogins == []
+
+    # the router dropped it meanwhile: one login, and its lifetime is noted
+    expired, relogins = _client_with_fake_login(FakeSession(valid="cookie1"))
+    stored["sysauth"] = "stale"
+    assert expired.restore_session(stored)
+    assert await expired.get("/cgi-bin/luci/admin/status") == "ok"
+    assert relogins == ["login"]
+    assert expired.export_session()["lifetime"] is not None
+
+
+def test_restore_session_skips_other_host_and_expired_cookie() -> None:
+    client = CudyClient("192.168.10.1", "admin", "secret")
+    stored = {"host": "192.168.10.1", "sysauth": "abc", "scheme": "https", "obtained_at": 1000.0, "lifetime": 600.0}
+
+    assert not CudyClient("192.168.1.1", "admin", "secret").restore_session(stored)
+    assert not client.restore_session(stored)
+    assert client.sysauth is None
+    # the scheme is still worth remembering
+    assert client._scheme == "https"
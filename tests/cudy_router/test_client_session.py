@@ -0,0 +1,302 @@
+import asyncio
+
+import aiohttp
+import pytest
+from multidict import CIMultiDict
+
+from custom_components.hass_cudy_router.client import (
+    KEEPALIVE_TIMEOUT,
+    SCHEME_REPROBE_AFTER,
+    CudyClient,
+    ResponseTooLarge,
+)
+from tests.cudy_router.fixtures import LOGIN_PAGE, FakeContent, FakeResponse
+
+
+@pytest.mark.asyncio
+async def test_private_session_uses_keepalive_pool_per_router() -> None:
+    client = CudyClient("192.168.10.1", "admin", "secret", connection_limit=3, verify_ssl=False)
+    try:
+        session = await client._ensure_session()
+        connector = session.connector
+
+        assert connector.limit_per_host == 3
+        assert connector._keepalive_timeout == KEEPALIVE_TIMEOUT
+        assert connector.use_dns_cache
+        assert connector._ssl is False
+        assert await client._ensure_session() is session
+    finally:
+        await client.async_close()
+
+
+@pytest.mark.asyncio
+async def test_injected_session_is_not_closed() -> None:
+    class Session:
+        closed = False
+
+    shared = Session()
+    client = CudyClient("192.168.10.1", "admin", "secret", session=shared)
+
+    assert await client._ensure_session() is shared
+    await client.async_close()
+    assert shared.closed is False
+
+
+class LoginSession:
+    """Router reachable on `schemes` only, always accepting the login."""
+
+    closed = False
+
+    def __init__(self, schemes: set[str]) -> None:
+        self.schemes = schemes
+        self.attempts: list[str] = []
+
+    def _check(self, url: str) -> None:
+        scheme = url.split("://", 1)[0]
+        self.attempts.append(scheme)
+        if scheme not in self.schemes:
+            raise aiohttp.ClientConnectionError(f"{scheme} refused")
+
+    def get(self, url: str, **kwargs):
+        self._check(url)
+        return _Response("<input name='token' value='abc' />", {})
+
+    def post(self, url: str, **kwargs):
+        return _Response("", {"Set-Cookie": "sysauth=cookie; path=/"})
+
+
+class _Response:
+    url = "http://192.168.10.1/cgi-bin/luci"
+
+    def __init__(self, text: str, headers: dict[str, str]) -> None:
+        self.status = 200
+        self.headers = CIMultiDict(headers)
+        self._text = text
+        self.content = FakeContent(text.encode())
+
+    async def __aenter__(self) -> "_Response":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        return None
+
+    async def text(self) -> str:
+        return self._text
+
+
+@pytest.mark.asyncio
+async def test_login_sticks_to_the_scheme_that_worked() -> None:
+    session = LoginSession({"https"})
+    client = CudyClient("192.168.10.1", "admin", "secret", session=session)
+
+    assert await client._login()
+    assert session.attempts == ["http", "https"]
+    assert client.base_url == "https://192.168.10.1"
+
+    session.attempts.clear()
+    assert await client._login()
+    assert session.attempts == ["https"]
+
+    # router moved back to plain http: re-probed only after repeated failures
+    session.schemes = {"http"}
+    session.attempts.clear()
+    for _ in range(SCHEME_REPROBE_AFTER):
+        assert not await client._login()
+    assert session.attempts == ["https"] * SCHEME_REPROBE_AFTER
+
+    assert await client._login()
+    assert client.scheme == "http"
+
+
+@pytest.mark.asyncio
+async def test_body_is_decoded_across_chunks_and_capped() -> None:
+    client = CudyClient("192.168.10.1", "admin", "secret", max_body_size=64)
+    page = "Połączenie – ok".encode()
+
+    # multi-byte characters split between chunks
+    resp = _Response("", {})
+    resp.content = FakeContent(page, chunk=3)
+    assert await client._read_text(resp) == "Połączenie – ok"
+
+    resp.content = FakeContent(b"x" * 65, chunk=16)
+    with pytest.raises(ResponseTooLarge):
+        await client._read_text(resp)
+
+    resp.content_length = 10_000
+    resp.content = FakeContent(b"")
+    with pytest.raises(ResponseTooLarge):
+        await client._read_text(resp)
+
+
+WIFI_FORM = """<form name="cbi">
+<input name="cbid.wireless.wlan00.disabled" value="0" />
+<input name="cbid.wireless.wlan10.disabled" value="1" /></form>"""
+VPN_FORM = """<form name="cbi">
+<input name="cbid.vpn.config.enabled" value="1" />
+<select name="cbid.vpn.config._proto"><option value="wireguard" selected>WireGuard</option></select></form>"""
+
+
+class ControlSession:
+    """Router with the Wi-Fi and generic VPN pages, no dedicated ZeroTier page."""
+
+    closed = False
+
+    def __init__(self) -> None:
+        self.paths: list[str] = []
+        self.urls: list[str] = []
+
+    def get(self, url: str, **kwargs) -> FakeResponse:
+        self.urls.append(url)
+        path = url.split("://", 1)[1].split("/", 1)[1]
+        self.paths.append(path.split("?")[0])
+        if "wireless/config/uncombine" in path:
+            return FakeResponse(200, WIFI_FORM)
+        if "vpn/config" in path:
+            return FakeResponse(200, VPN_FORM)
+        return FakeResponse(404, "<html>not found</html>")
+
+
+class ExpiringControlSession(ControlSession):
+    """Serves the login form (status 200) to any cookie but `valid`."""
+
+    def __init__(self, valid: str) -> None:
+        super().__init__()
+        self.valid = valid
+
+    def get(self, url: str, headers: dict[str, str] | None = None, **kwargs) -> FakeResponse:
+        if (headers or {}).get("Cookie") != f"sysauth={self.valid}":
+            self.urls.append(url)
+            return FakeResponse(200, LOGIN_PAGE)
+        return super().get(url, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_control_state_reads_each_page_once_for_all_switches() -> None:
+    session = ControlSession()
+    client = CudyClient("192.168.10.1", "admin", "secret", session=session)
+    client._set_sysauth("cookie")
+
+    states = await asyncio.gather(*(client.async_get_control_state() for _ in range(4)))
+    assert states == [{"2g": True, "5g": False, "wireguard": True, "zerotier": False}] * 4
+    # wifi, the four ZeroTier candidates, vpn config
+    assert len(session.paths) == 6
+
+    session.paths.clear()
+    client.scheduler.invalidate()
+    await client.async_get_control_state()
+    assert session.paths == [
+        "cgi-bin/luci/admin/network/wireless/config/uncombine",
+        "cgi-bin/luci/admin/network/vpn/config",
+    ]
+
+    # the scheme fell back meanwhile: the remembered pages follow it
+    session.urls.clear()
+    client._scheme = "https"
+    client.scheduler.invalidate()
+    await client.async_get_control_state()
+    assert len(session.urls) == 2
+    assert all(url.startswith("https://192.168.10.1/cgi-bin/luci/") and "_=" in url for url in session.urls)
+
+
+@pytest.mark.asyncio
+async def test_wifi_state_and_control_state_do_not_share_reads() -> None:
+    client = CudyClient("192.168.10.1", "admin", "secret", session=ControlSession())
+    client._set_sysauth("cookie")
+
+    wifi, control = await asyncio.gather(client.async_get_wifi_state(), client.async_get_control_state())
+    assert wifi == {"2g": True, "5g": False}
+    assert control["2g"] is True
+
+
+class WifiWriteSession(ControlSession):
+    def __init__(self) -> None:
+        super().__init__()
+        self.posts: list[dict[str, str]] = []
+
+    def get(self, url: str, **kwargs) -> FakeResponse:
+        self.paths.append("GET")
+        return FakeResponse(200, WIFI_FORM.replace("</form>", '<input name="token" value="tok" /></form>'))
+
+    def post(self, url: str, data=None, **kwargs) -> FakeResponse:
+        self.posts.append({f[0]["name"]: f[2] for f in data._fields})
+        return FakeResponse(200, "ok")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_wifi_toggles_are_submitted_together(monkeypatch) -> None:
+    monkeypatch.setattr("custom_components.hass_cudy_router.client.WRITE_BATCH_WINDOW", 0.01)
+    session = WifiWriteSession()
+    client = CudyClient("192.168.10.1", "admin", "secret", session=session)
+    client._set_sysauth("cookie")
+    restarts: list[str] = []
+
+    async def restart(services: str, token: str, **kwargs) -> bool:
+        restarts.append(services)
+        return True
+
+    client._servicectl_restart = restart
+
+    assert await asyncio.gather(client.async_set_wifi("2g", False), client.async_set_wifi("5g", True)) == [True, True]
+    assert session.paths == ["GET"]
+    assert len(session.posts) == 1
+    assert session.posts[0]["cbid.wireless.wlan00.disabled"] == "1"
+    assert session.posts[0]["cbid.wireless.wlan10.disabled"] == "0"
+    assert restarts == ["wireless,vlan"]
+
+
+@pytest.mark.asyncio
+async def test_wifi_change_whose_apply_fails_is_reported(monkeypatch) -> None:
+    monkeypatch.setattr("custom_components.hass_cudy_router.client.WRITE_BATCH_WINDOW", 0)
+    client = CudyClient("192.168.10.1", "admin", "secret", session=WifiWriteSession())
+    client._set_sysauth("cookie")
+
+    async def restart(services: str, token: str, **kwargs) -> bool:
+        return False
+
+    client._servicectl_restart = restart
+
+    assert await client.async_set_wifi("2g", False) is False
+
+
+@pytest.mark.asyncio
+async def test_cancelled_wifi_toggle_does_not_drop_the_others(monkeypatch) -> None:
+    monkeypatch.setattr("custom_components.hass_cudy_router.client.WRITE_BATCH_WINDOW", 0.05)
+    session = WifiWriteSession()
+    client = CudyClient("192.168.10.1", "admin", "secret", session=session)
+    client._set_sysauth("cookie")
+
+    async def restart(services: str, token: str, **kwargs) -> bool:
+        return True
+
+    client._servicectl_restart = restart
+
+    first = asyncio.create_task(client.async_set_wifi("2g", False))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(client.async_set_wifi("5g", True))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second is True
+    assert session.posts[0]["cbid.wireless.wlan00.disabled"] == "1"
+    assert session.posts[0]["cbid.wireless.wlan10.disabled"] == "0"
+
+
+@pytest.mark.asyncio
+async def test_control_state_logs_in_again_when_served_the_login_page() -> None:
+    session = ExpiringControlSession(valid="fresh")
+    client = CudyClient("192.168.10.1", "admin", "secret", session=session)
+    client._set_sysauth("expired")
+    logins: list[str] = []
+
+    async def fake_login() -> bool:
+        logins.append("login")
+        client._set_sysauth("fresh")
+        return True
+
+    client._login = fake_login
+
+    state = await client.async_get_control_state()
+
+    assert state == {"2g": True, "5g": False, "wireguard": True, "zerotier": False}
+    assert logins == ["login"]
+    assert client.login_page_reauths == 1
@@ -3,15 +3,26 @@ from __future__ import annotations
 from unittest.mock import AsyncMock, patch
 
 import pytest
+import voluptuous as vol
 from homeassistant import data_entry_flow
 from homeassistant.const import (
     CONF_HOST,
     CONF_PASSWORD,
     CONF_PROTOCOL,
+    CONF_SCAN_INTERVAL,
     CONF_USERNAME,
 )
-
-from custom_components.hass_cudy_router.const import DOMAIN
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.hass_cudy_router.client import CudyClient
+from custom_components.hass_cudy_router.config_flow import validate_input
+from custom_components.hass_cudy_router.const import (
+    CONF_CONTROL_SCAN_INTERVAL,
+    CONF_MAX_BODY_SIZE,
+    CONF_MAX_CONCURRENCY,
+    CONF_SLOW_SCAN_INTERVAL,
+    DOMAIN,
+)
 
 
 @pytest.mark.asyncio
@@ -129,4 +140,49 @@ async def test_config_flow_unknown_error(hass):
         )
 
         assert result2["type"] == data_entry_flow.FlowResultType.FORM
-        assert result2["errors"]["base"] == "cannot_connect"
\ No newline at end of file
+        assert result2["errors"]["base"] == "cannot_connect"
+
+
+@pytest.mark.asyncio
+async def test_validate_input_logs_in_on_a_private_session(hass):
+    clients: list[CudyClient] = []
+
+    async def authenticate(self) -> bool:
+        clients.append(self)
+        await self._ensure_session()
+        self._set_sysauth("cookie")
+        return True
+
+    with patch.object(CudyClient, "authenticate", authenticate):
+        info = await validate_input(
+            hass, {CONF_HOST: "192.168.10.1", CONF_USERNAME: "admin", CONF_PASSWORD: "secret"}
+        )
+
+    assert info["session"]["sysauth"] == "cookie"
+    (client,) = clients
+    # not HA's shared session, and closed once validated
+    assert not client._external_session
+    assert client._session is None
+
+
+@pytest.mark.asyncio
+async def test_options_flow_rejects_out_of_range_values(hass):
+    entry = MockConfigEntry(domain=DOMAIN, data={CONF_HOST: "192.168.10.1"}, options={})
+    entry.add_to_hass(hass)
+
+    for field, value in (
+        (CONF_SCAN_INTERVAL, 0),
+        (CONF_SLOW_SCAN_INTERVAL, -5),
+        (CONF_MAX_BODY_SIZE, 0),
+        (CONF_CONTROL_SCAN_INTERVAL, 0),
+        (CONF_MAX_CONCURRENCY, 0),
+        (CONF_MAX_CONCURRENCY, 100),
+    ):
+        result = await hass.config_entries.options.async_init(entry.entry_id)
+        with pytest.raises(vol.Invalid):
+            await hass.config_entries.options.async_configure(result["flow_id"], {field: value})
+
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+    result = await hass.config_entries.options.async_configure(result["flow_id"], {CONF_SCAN_INTERVAL: "45"})
+    assert result["type"] == data_entry_flow.FlowResultType.CREATE_ENTRY
+    assert entry.options[CONF_SCAN_INTERVAL] == 45
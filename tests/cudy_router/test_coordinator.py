@@ -1,14 +1,18 @@
 from __future__ import annotations
 
+import asyncio
 from unittest.mock import AsyncMock
 
 import pytest
+from homeassistant.config_entries import ConfigEntryState
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.update_coordinator import UpdateFailed
 from pytest_homeassistant_custom_component.common import MockConfigEntry
 
-from custom_components.hass_cudy_router.const import DOMAIN, SENSOR_SYSTEM_FIRMWARE_VERSION
-from custom_components.hass_cudy_router.coordinator import CudyCoordinator
+from custom_components.hass_cudy_router.client import CudyClient
+from custom_components.hass_cudy_router.const import DOMAIN, MODULE_GSM, SENSOR_SYSTEM_FIRMWARE_VERSION
+from custom_components.hass_cudy_router.coordinator import CudyControlCoordinator, CudyCoordinator
+from custom_components.hass_cudy_router.registry import CudyIntegration
 
 
 @pytest.mark.asyncio
@@ -48,4 +52,63 @@ async def test_coordinator_api_exception_wraps_updatefailed(hass: HomeAssistant)
     c = CudyCoordinator(hass=hass, entry=entry, api=api, host="test")
 
     with pytest.raises(UpdateFailed):
-        await c._async_update_data()
\ No newline at end of file
+        await c._async_update_data()
+
+
+@pytest.mark.asyncio
+async def test_control_coordinator_reads_the_snapshot_once(hass: HomeAssistant):
+    entry = MockConfigEntry(domain=DOMAIN, data={"host": "test"}, options={})
+    entry.add_to_hass(hass)
+
+    client = AsyncMock()
+    client.async_get_control_state.return_value = {"2g": True, "5g": False, "wireguard": False}
+    c = CudyControlCoordinator(hass, entry, client, host="test")
+
+    await c.async_refresh()
+
+    assert c.data == {"2g": True, "5g": False, "wireguard": False}
+    client.async_get_control_state.assert_awaited_once()
+    client.async_get_wifi_state.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_control_coordinator_falls_back_to_per_switch_getters(hass: HomeAssistant):
+    entry = MockConfigEntry(domain=DOMAIN, data={"host": "test"}, options={})
+    entry.add_to_hass(hass)
+
+    class LegacyClient:
+        async def async_get_wifi_state(self):
+            return {"2g": True, "5g": True}
+
+        async def async_get_vpn_state(self):
+            raise RuntimeError("no vpn page")
+
+    c = CudyControlCoordinator(hass, entry, LegacyClient(), host="test")
+    assert await c._async_update_data() == {"2g": True, "5g": True}
+
+    with pytest.raises(UpdateFailed):
+        await CudyControlCoordinator(hass, entry, object(), host="test")._async_update_data()
+
+
+@pytest.mark.asyncio
+async def test_setup_refreshes_the_fast_tier_first(hass: HomeAssistant):
+    entry = MockConfigEntry(domain=DOMAIN, data={"host": "test"}, options={})
+    entry.add_to_hass(hass)
+    integration = CudyIntegration(hass, entry, CudyClient("test", "admin", "secret"), model="P4")
+    order: list[str] = []
+
+    async def get_data(modules=None, **kwargs):
+        tier = "fast" if MODULE_GSM in modules else "other"
+        order.append(f"{tier} start")
+        # the other tiers answer quicker: WAN must still see the GSM data
+        await asyncio.sleep(0.02 if tier == "fast" else 0)
+        order.append(f"{tier} end")
+        return {}
+
+    integration.api.get_data = get_data
+    integration.control_coordinator.async_refresh = AsyncMock()
+    entry.mock_state(hass, ConfigEntryState.SETUP_IN_PROGRESS)
+
+    await integration.async_setup()
+
+    assert order[:2] == ["fast start", "fast end"]
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import pytest
+
+from custom_components.hass_cudy_router.client import CudyClient
+from custom_components.hass_cudy_router.metrics import RequestMetrics, percentile, url_template
+from tests.cudy_router.fixtures import FakeResponse, FakeSession
+
+
+def test_url_template_groups_by_endpoint() -> None:
+    assert (
+        url_template("http://192.168.10.1/cgi-bin/luci/admin/network/wireless/config/uncombine?embedded=&_=1712")
+        == "/cgi-bin/luci/admin/network/wireless/config/uncombine"
+    )
+    assert url_template("http://h/cgi-bin/luci/admin/sms/read/12") == "/cgi-bin/luci/admin/sms/read/{n}"
+
+
+def test_percentile_nearest_rank() -> None:
+    assert percentile([], 95) is None
+    assert percentile([3.0, 1.0, 2.0], 50) == 2.0
+    assert percentile(range(1, 101), 95) == 95
+
+
+def test_metrics_ring_buffer_and_summary() -> None:
+    metrics = RequestMetrics(max_requests=3)
+    for latency in (0.1, 0.2, 0.3, 0.4):
+        metrics.record_request("get", "http://h/cgi-bin/luci/a?x=1", status=200, size=10, ttfb=0.05, latency=latency)
+    metrics.record_request("post", "http://h/cgi-bin/luci/b", status=None, size=None, ttfb=None, latency=1.0, retries=1)
+    metrics.record_poll("fast", 1.5, True)
+
+    summary = metrics.summary()
+
+    assert summary["requests"] == 3
+    assert summary["endpoints"]["GET /cgi-bin/luci/a"]["count"] == 2
+    assert summary["endpoints"]["POST /cgi-bin/luci/b"] == {
+        "count": 1,
+        "errors": 1,
+        "retries": 1,
+        "last_status": None,
+        "latency_p50_ms": 1000.0,
+        "latency_p95_ms": 1000.0,
+        "ttfb_p95_ms": None,
+        "bytes_max": None,
+    }
+    assert summary["polls"]["fast"]["last_s"] == 1.5
+    assert metrics.error_rate() == pytest.approx(1 / 3)
+
+
+@pytest.mark.asyncio
+async def test_client_records_requests_and_retries() -> None:
+    client = CudyClient("192.168.10.1", "admin", "secret", session=FakeSession(valid="cookie2"))
+    client._set_sysauth("cookie1")
+
+    async def fake_login() -> bool:
+        client._set_sysauth("cookie2")
+        return True
+
+    client._login = fake_login
+
+    assert await client.get("/cgi-bin/luci/admin/status?_=1") == "ok"
+
+    endpoint = client.metrics.summary()["endpoints"]["GET /cgi-bin/luci/admin/status"]
+    assert endpoint["count"] == 2
+    assert endpoint["errors"] == 1
+    assert endpoint["retries"] == 1
+    assert endpoint["last_status"] == 200
+
+
+class ServicectlSession:
+    """Router that reports the restart finished on the third status check."""
+
+    closed = False
+
+    def __init__(self) -> None:
+        self.status_checks = 0
+
+    def post(self, url: str, **kwargs) -> FakeResponse:
+        return FakeResponse(200, "")
+
+    def get(self, url: str, **kwargs) -> FakeResponse:
+        self.status_checks += 1
+        return FakeResponse(200, "finish" if self.status_checks == 3 else "running")
+
+
+@pytest.mark.asyncio
+async def test_servicectl_restart_reports_progress_and_records_duration(monkeypatch) -> None:
+    monkeypatch.setattr("custom_components.hass_cudy_router.client.SERVICECTL_POLL_MIN", 0.01)
+    events: list[dict] = []
+    session = ServicectlSession()
+    client = CudyClient("192.168.10.1", "admin", "secret", session=session, on_apply_progress=events.append)
+    client._set_sysauth("cookie")
+
+    assert await client._servicectl_restart("wireless,vlan", "tok")
+
+    assert [e["stage"] for e in events] == ["started", "waiting", "waiting", "finished"]
+    assert events[-1]["polls"] == 3
+    assert events[-1]["progress"] == 1.0
+    assert client.applies["wireless,vlan"] == events[-1]
+
+    applies = client.metrics.summary()["applies"]["wireless,vlan"]
+    assert applies["count"] == 1
+    assert applies["failures"] == 0
+    assert applies["histogram"]["le_1s"] == 1
+    assert sum(applies["histogram"].values()) == 1
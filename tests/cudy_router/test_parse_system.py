@@ -2,7 +2,7 @@ import pytest
 
 from custom_components.hass_cudy_router.const import *
 from custom_components.hass_cudy_router.parser import parse_module_by_sensors
-from tests.cudy_router.fixtures import read_html, html_exists
+from tests.cudy_router.fixtures import BASE, read_html, html_exists
 
 @pytest.mark.asyncio
 @pytest.mark.parametrize("model", CUDY_DEVICES)
@@ -16,4 +16,69 @@ async def test_parse_system(model: str):
             for sensor in sensors:
                 sensor_key = sensor[SENSORS_KEY_KEY]
                 assert sensor_key in data
-                assert data[sensor_key] != 'n/a'
\ No newline at end of file
+                assert data[sensor_key] != 'n/a'
+
+
+@pytest.mark.parametrize("module_key", [MODULE_DEVICES, MODULE_DEVICE_LIST, MODULE_SYSTEM])
+def test_parse_html_builds_dom_once(monkeypatch, module_key: str):
+    from custom_components.hass_cudy_router import parser
+
+    built: list[int] = []
+
+    class CountingSoup(parser.BeautifulSoup):
+        def __init__(self, *args, **kwargs):
+            built.append(1)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(parser, "BeautifulSoup", CountingSoup)
+
+    parser.parse_html(module_key, read_html("WR3600", f"{module_key}.html"))
+
+    # plain label/value pages go through the streaming scanner
+    assert len(built) == (0 if module_key == MODULE_SYSTEM else 1)
+
+
+@pytest.mark.parametrize("path", sorted(BASE.glob("*/*.html")), ids=lambda p: f"{p.parent.name}/{p.name}")
+def test_scan_kv_pairs_matches_dom(path):
+    from custom_components.hass_cudy_router import parser
+
+    text = read_html(path.parent.name, path.name)
+    fast = parser.scan_kv_pairs(text)
+    dom = parser.extract_kv_pairs(parser.make_soup(text))
+
+    assert fast is not None
+    assert list(fast.items()) == list(dom.items())
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "<table><tr><td>Outer</td><td><table><tr><td>A</td><td>1</td></tr></table></td></tr></table>",
+        "<table><tr><td>A<td>1</tr></table>",
+        "<dl><dt>A<dd>1</dl>",
+        "<table><tr><td><p>A<p>B</p></p></td><td>1</td></tr></table>",
+    ],
+)
+def test_scan_kv_pairs_falls_back_on_irregular_pages(text):
+    from custom_components.hass_cudy_router import parser
+
+    assert parser.scan_kv_pairs(text) is None
+    assert parser.extract_kv_pairs(text) == parser.extract_kv_pairs(parser.make_soup(text))
+
+
+@pytest.mark.parametrize(
+    ("rows", "expected"),
+    [
+        ([("Firmware", "2.0"), ("Firmware Version", "2.1")], "2.1"),
+        ([("FIRMWARE VERSION", "2.0"), ("Firmware Version", "2.1"), ("firmware version", "2.2")], "2.1"),
+        ([("FIRMWARE VERSION", "2.0"), ("firmware version", "2.2")], "2.2"),
+        ([("Firmware", " 2.3 ")], "2.3"),
+    ],
+)
+def test_parse_module_by_sensors_label_priority(rows, expected):
+    text = "<table>" + "".join(f"<tr><td>{k}</td><td>{v}</td></tr>" for k, v in rows) + "</table>"
+
+    data = parse_module_by_sensors(MODULE_SYSTEM, text)
+
+    assert data[SENSOR_SYSTEM_FIRMWARE_VERSION] == expected
+    assert list(data) == [s[SENSORS_KEY_KEY] for s in SENSORS[MODULE_SYSTEM]]
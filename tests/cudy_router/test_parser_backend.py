@@ -0,0 +1,27 @@
+import pytest
+
+from custom_components.hass_cudy_router import parser
+from custom_components.hass_cudy_router.const import *
+from tests.cudy_router.fixtures import BASE, read_html
+
+# lxml is optional (not in the manifest): the comparison only runs where it is installed
+pytest.importorskip("lxml")
+
+PAGES = sorted((p.parent.name, p.name) for p in BASE.glob("*/*.html"))
+
+
+def _parse_all(monkeypatch, backend: str, model: str, name: str) -> dict:
+    monkeypatch.setattr(parser, "HTML_BACKEND", backend)
+    html = read_html(model, name)
+    module = name[: -len(".html")]
+    modules = {module, MODULE_SYSTEM, MODULE_DEVICES, MODULE_DEVICE_LIST} & set(CAPABILITY_URLS)
+    out = {m: parser.parse_html(m, html) for m in sorted(modules)}
+    # a soup, not the string: a string takes the scanner and skips the backend
+    out["kv"] = parser.extract_kv_pairs(parser.make_soup(html, backend))
+    return out
+
+
+@pytest.mark.parametrize(("model", "name"), PAGES)
+def test_lxml_backend_matches_html_parser(monkeypatch, model: str, name: str) -> None:
+    expected = _parse_all(monkeypatch, "html.parser", model, name)
+    assert _parse_all(monkeypatch, "lxml", model, name) == expected
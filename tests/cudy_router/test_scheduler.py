@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from custom_components.hass_cudy_router.client import CudyClient
+from custom_components.hass_cudy_router.scheduler import Priority, RequestScheduler, request_priority
+from tests.cudy_router.fixtures import FakeSession
+
+
+@pytest.mark.asyncio
+async def test_writes_overtake_queued_reads() -> None:
+    scheduler = RequestScheduler(rate=50, burst=1)
+    order: list[str] = []
+
+    async def send(name: str, priority: Priority) -> None:
+        await scheduler.acquire(priority)
+        order.append(name)
+
+    await scheduler.acquire()
+    reads = [asyncio.create_task(send(f"read{i}", Priority.BACKGROUND)) for i in range(3)]
+    await asyncio.sleep(0)
+    write = asyncio.create_task(send("write", Priority.WRITE))
+    await asyncio.gather(*reads, write)
+
+    assert order == ["write", "read0", "read1", "read2"]
+    assert scheduler.granted == {"write": 1, "interactive": 0, "background": 4}
+
+
+@pytest.mark.asyncio
+async def test_identical_reads_share_one_answer_until_a_write() -> None:
+    scheduler = RequestScheduler(window=60)
+    calls: list[int] = []
+
+    async def read() -> str:
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return f"answer{len(calls)}"
+
+    results = await asyncio.gather(*(scheduler.coalesce("page", read) for _ in range(3)))
+    assert results == ["answer1"] * 3
+    assert await scheduler.coalesce("page", read) == "answer1"
+
+    scheduler.invalidate()
+    assert await scheduler.coalesce("page", read) == "answer2"
+    with request_priority(Priority.WRITE):
+        assert await scheduler.coalesce("page", read) == "answer3"
+    assert scheduler.coalesced == 3
+
+
+@pytest.mark.asyncio
+async def test_client_coalesces_gets_and_writes_invalidate() -> None:
+    session = FakeSession(valid="cookie")
+    client = CudyClient("192.168.10.1", "admin", "secret", session=session)
+    client._set_sysauth("cookie")
+
+    await asyncio.gather(*(client.get("/cgi-bin/luci/admin/status") for _ in range(4)))
+    assert len(session.requests) == 1
+
+    await client.post("/cgi-bin/luci/admin/system/reboot", data={"reboot": "1"})
+    await client.get("/cgi-bin/luci/admin/status")
+    assert len(session.requests) == 3
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.hass_cudy_router import switch as switch_platform
+from custom_components.hass_cudy_router.const import DOMAIN
+from custom_components.hass_cudy_router.coordinator import CudyControlCoordinator
+from custom_components.hass_cudy_router.switch import WIFI_24, CudyWifiSwitch
+
+
+class SlowWifiClient:
+    """Applies a Wi-Fi change after `delay`; `reject` makes the router ignore it."""
+
+    def __init__(self, *, delay: float = 0.05, reject: bool = False) -> None:
+        self.state = {"2g": False, "5g": True}
+        self.delay = delay
+        self.reject = reject
+        # reads failing after the next change was applied
+        self.unreadable_after_set = 0
+        self._unreadable = 0
+
+    async def async_get_control_state(self) -> dict[str, bool]:
+        if self._unreadable:
+            self._unreadable -= 1
+            raise RuntimeError("router busy")
+        return dict(self.state)
+
+    async def async_set_wifi(self, band: str, enabled: bool) -> bool:
+        await asyncio.sleep(self.delay)
+        if not self.reject:
+            self.state[band] = enabled
+        self._unreadable = self.unreadable_after_set
+        return True
+
+
+async def _switch(hass: HomeAssistant, client: SlowWifiClient) -> CudyWifiSwitch:
+    entry = MockConfigEntry(domain=DOMAIN, data={"host": "test"}, options={})
+    entry.add_to_hass(hass)
+    coordinator = CudyControlCoordinator(hass, entry, client, host="test")
+    await coordinator.async_refresh()
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {"client": client, "control_coordinator": coordinator}
+
+    switch = CudyWifiSwitch(hass, entry, coordinator, band="2g", description=WIFI_24)
+    switch.entity_id = "switch.cudy_wifi_2_4_ghz"
+    switch._update_from_coordinator()
+    return switch
+
+
+@pytest.mark.asyncio
+async def test_toggle_returns_at_once_and_is_confirmed_in_background(hass: HomeAssistant, monkeypatch) -> None:
+    notifications: list[str] = []
+    monkeypatch.setattr(
+        switch_platform.persistent_notification,
+        "async_create",
+        lambda hass, message, **kwargs: notifications.append(kwargs["notification_id"]),
+    )
+    client = SlowWifiClient()
+    switch = await _switch(hass, client)
+
+    await switch.async_turn_on()
+    # optimistic: on before the router applied anything
+    assert switch.is_on
+    assert client.state["2g"] is False
+    assert switch.extra_state_attributes["applying"]
+
+    await switch._apply_task
+    assert switch.is_on
+    assert client.state["2g"] is True
+    assert not switch.extra_state_attributes["applying"]
+    assert switch.extra_state_attributes["last_apply_duration"] is not None
+    assert notifications == []
+
+
+@pytest.mark.asyncio
+async def test_toggle_not_applied_reverts_and_notifies(hass: HomeAssistant, monkeypatch) -> None:
+    notifications: list[str] = []
+    monkeypatch.setattr(
+        switch_platform.persistent_notification,
+        "async_create",
+        lambda hass, message, **kwargs: notifications.append(kwargs["notification_id"]),
+    )
+    switch = await _switch(hass, SlowWifiClient(reject=True))
+
+    await switch.async_turn_on()
+    assert switch.is_on
+    await switch._apply_task
+
+    assert not switch.is_on
+    assert notifications == [f"{DOMAIN}_{switch.unique_id}_apply"]
+
+
+@pytest.mark.asyncio
+async def test_applied_change_not_read_back_is_kept(hass: HomeAssistant, monkeypatch) -> None:
+    notifications: list[str] = []
+    monkeypatch.setattr(
+        switch_platform.persistent_notification,
+        "async_create",
+        lambda hass, message, **kwargs: notifications.append(kwargs["notification_id"]),
+    )
+    monkeypatch.setattr(switch_platform, "SWITCH_CONFIRM_RETRY", 0)
+    client = SlowWifiClient()
+    client.unreadable_after_set = 2
+    switch = await _switch(hass, client)
+
+    await switch.async_turn_on()
+    await switch._apply_task
+
+    # the old snapshot (off) is still in the coordinator: not a failure
+    assert switch.is_on
+    assert notifications == []
+
+    await switch.coordinator.async_refresh()
+    switch._update_from_coordinator()
+    assert switch.is_on